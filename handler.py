@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 
 # Import get_logger instead of logger
 from utils.logger import get_logger
@@ -8,27 +9,68 @@ from utils.logger import get_logger
 logger = get_logger(__name__)
 
 # Import your route handlers
-# from routes.get_greetings import handle_get_greetings
-# from routes.post_greetings import handle_post_greetings
+from routes.get_greetings import handle_get_greetings, handle_post_greetings_batch
+from routes.post_greetings import handle_post_greetings
+from routes.post_greeting_upload import handle_post_greeting_upload, handle_post_greeting_complete
 from routes.get_voices import handle_get_voices
+from routes.get_callflow_bundle import handle_get_callflow_bundle
 from routes.post_speech import handle_post_speech
 from routes.get_predefined_attributes import handle_get_predefined_attributes
+from routes.get_predefined_attribute_search import handle_get_predefined_attribute_search
 from routes.delete_predefined_attribute import handle_delete_predefined_attributes
 from routes.post_predefined_attributes import handle_post_predefined_attributes
-from routes.get_email_template import handle_get_email_template_app
-from routes.post_task_template import handle_post_task_template_app
+from routes.post_predefined_attributes_bulk import handle_post_predefined_attributes_bulk
+from routes.get_email_template import handle_get_email_template_app, handle_email_template_stream
+from routes.post_email_template_render import handle_post_email_template_render
+from routes.post_task_template import handle_post_task_template_app, drain_task_queue
 from routes.post_chaneltype_configs import handle_chaneltype_configs
-from routes.post_chaneltype_prompts import handle_chaneltype_prompts
+from routes.post_chaneltype_prompts import handle_chaneltype_prompts, drain_prompt_synthesis
 from routes.post_user_config import handle_user_configs
 from routes.post_profile_config import handle_profile_configs
 from routes.get_profile_dashboards import handle_get_profile_dashboard
 from routes.post_agent_proficiency_profiles import handle_agent_proficiency_profiles
 from routes.post_agent_proficiency_assignment import handle_agent_proficiency_assignment
 
+# Seconds each drain leaves free before the invocation times out (bookkeeping, lease release)
+DRAIN_TIME_MARGIN = 60
+
+
+def run_scheduled_drains(context=None):
+    """
+    Run each work queue drain in isolation: a failure in one never skips the
+    other, and every drain's deadline is capped by the invocation's remaining
+    time so a timeout cannot strand claimed tickets.
+    """
+    results = {}
+    for name, drain in (("tasks", drain_task_queue), ("promptSynthesis", drain_prompt_synthesis)):
+        deadline = None
+        if context is not None:
+            remaining = context.get_remaining_time_in_millis() / 1000 - DRAIN_TIME_MARGIN
+            if remaining <= 0:
+                logger.warning(f"[DRAIN] Skipping {name}: no time left in this invocation")
+                results[name] = {"skipped": "No time left in this invocation"}
+                continue
+            deadline = time.time() + remaining
+        try:
+            results[name] = drain(deadline=deadline)
+        except Exception as e:
+            logger.exception(f"[DRAIN] {name} failed")
+            results[name] = {"error": str(e)}
+    return results
+
 
 def lambda_handler(event, context):
     logger.info(f"Received event: {json.dumps(event)}")
 
+    # --- DynamoDB Stream (email templates table) ---
+    records = event.get("Records") or []
+    if records and records[0].get("eventSource") == "aws:dynamodb":
+        return handle_email_template_stream(event)
+
+    # --- Scheduled drain of the async work queues (EventBridge rule) ---
+    if event.get("source") == "aws.events":
+        return run_scheduled_drains(context)
+
     resource = event.get('resource', '')
     path = event.get('path', '')
     http_method = event.get('httpMethod', '')
@@ -46,7 +88,7 @@ def lambda_handler(event, context):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token",
+                "Access-Control-Allow-Headers": "Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,If-None-Match",
                 "Access-Control-Max-Age": "600",
             },
             "body": json.dumps({"message": "ok"}),
@@ -60,30 +102,44 @@ def lambda_handler(event, context):
             )
         elif resource == '/agent-greeting' and http_method == 'POST':
             return handle_post_greetings(json.loads(body))
+        elif resource == '/agent-greeting/batch' and http_method == 'POST':
+            return handle_post_greetings_batch(json.loads(body))
+        elif resource == '/agent-greeting/upload' and http_method == 'POST':
+            return handle_post_greeting_upload(json.loads(body))
+        elif resource == '/agent-greeting/complete' and http_method == 'POST':
+            return handle_post_greeting_complete(json.loads(body))
         elif resource == '/polly/languages' and http_method == 'GET':
-            return handle_get_voices()
+            return handle_get_voices(query_params)
         elif resource == '/polly/speech' and http_method == 'POST':
             return handle_post_speech(json.loads(body))
         elif resource == '/business-configuration/users' and http_method == 'GET':
             return handle_get_users()
         elif resource == '/admin-configuration/predefined-attributes' and http_method == 'GET':
             return handle_get_predefined_attributes()
+        elif resource == '/admin-configuration/predefined-attributes/search' and http_method == 'GET':
+            return handle_get_predefined_attribute_search(query_params)
         elif resource == '/admin-configuration/predefined-attributes/{attributeName+}' and http_method == 'DELETE':
             return handle_delete_predefined_attributes(path_params)
         elif resource == '/admin-configuration/predefined-attributes' and http_method == 'POST':
             return handle_post_predefined_attributes(json.loads(body))
+        elif resource == '/admin-configuration/predefined-attributes/bulk' and http_method == 'POST':
+            return handle_post_predefined_attributes_bulk(body)
         elif resource == '/business-configuration/user-proficiencies' and http_method == 'POST':
             return handle_post_user_proficiencies(json.loads(body))
         elif resource == '/business-configuration/user-proficiencies-bulk' and http_method == 'POST':
             return handle_post_user_proficiencies_bulk(json.loads(body))
         elif resource == '/email-template-app/{routingProfile+}' and http_method == 'GET':
-            return handle_get_email_template_app(path_params)
+            return handle_get_email_template_app(path_params, event.get('headers') or {}, query_params)
+        elif resource == '/email-template-app/render' and http_method == 'POST':
+            return handle_post_email_template_render(json.loads(body))
         elif resource == '/task-template-app' and http_method == 'POST':
             return handle_post_task_template_app(json.loads(body))
         elif resource == '/chaneltypeconfigs' and http_method == 'POST':
             return handle_chaneltype_configs(json.loads(body))
         elif resource == '/chaneltypeprompts' and http_method == 'POST':
             return handle_chaneltype_prompts(json.loads(body))
+        elif resource == '/callflow-bundle' and http_method == 'GET':
+            return handle_get_callflow_bundle(query_params)
         elif resource == '/userconfig' and http_method == 'POST':
             return handle_user_configs(json.loads(body))
         elif resource == '/profileconfig' and http_method == 'POST':
@@ -1,6 +1,7 @@
 from utils.aws_clients import connect
 from utils.logger import get_logger
 from utils.http import respond
+from utils.predefined_attributes import invalidate_predefined_attribute_catalog
 from botocore.exceptions import ClientError
 import os
 import json
@@ -42,6 +43,7 @@ def handle_delete_predefined_attributes(path_params):
             Name=attribute_name
         )
 
+        invalidate_predefined_attribute_catalog(INSTANCE_ID)
         logger.info(f"[DELETE SUCCESS] Attribute '{attribute_name}' deleted successfully.")
         return respond(200, {
             "deleted": True,
@@ -0,0 +1,74 @@
+from utils.logger import get_logger
+from utils.http import EnhancedJSONEncoder, respond, respond_serialized
+from utils.callflow_bundle import BUNDLE_CACHE, bundle_cache_key
+from routes.post_chaneltype_configs import _query_configs, _to_ui_item
+from routes.post_chaneltype_prompts import _query_prompts
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import json
+
+# ---------------------------------------------------------------------------
+# Logger setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Helper: Build the bundle (configs + prompts queried in parallel)
+# ---------------------------------------------------------------------------
+def _load_bundle(business_group: str, channel_type: str) -> str:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        configs = executor.submit(_query_configs, business_group, channel_type)
+        prompts = executor.submit(_query_prompts, business_group, channel_type)
+        config_items, prompt_items = configs.result(), prompts.result()
+
+    logger.info(f"[BUNDLE] Loaded BG={business_group}, Channel={channel_type}: "
+                f"{len(config_items)} configs, {len(prompt_items)} prompts")
+    return json.dumps({
+        "businessGroup": business_group,
+        "channelType": channel_type,
+        "configs": [_to_ui_item(it) for it in config_items],
+        "prompts": [{k.replace("#", "_"): v for k, v in it.items()} for it in prompt_items],
+    }, cls=EnhancedJSONEncoder)
+
+# ---------------------------------------------------------------------------
+# Handler
+# ---------------------------------------------------------------------------
+def handle_get_callflow_bundle(query_params: dict = None):
+    """
+    Configs and prompts for one business group and channel in a single
+    response, served from the bundle cache (invalidated by every
+    /chaneltypeconfigs and /chaneltypeprompts write).
+
+    Query parameters:
+        businessGroup=Retail   channelType=voice | chat | generic
+    """
+
+    query_params = query_params or {}
+    business_group = query_params.get("businessGroup")
+    channel_type = query_params.get("channelType")
+
+    # ---------------- Validation ----------------
+    if not business_group or not channel_type:
+        logger.warning("[BUNDLE] Missing businessGroup or channelType")
+        return respond(400, {
+            "error": "BadRequest",
+            "message": "Both 'businessGroup' and 'channelType' are required."
+        })
+
+    try:
+        body = BUNDLE_CACHE.get_or_load(
+            bundle_cache_key(business_group, channel_type),
+            lambda: _load_bundle(business_group, channel_type)
+        )
+        return respond_serialized(200, body)
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[ERROR] Failed to load call-flow bundle")
+        return respond(500, {"error": "InternalServerError", "message": str(e)})
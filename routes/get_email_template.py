@@ -1,21 +1,39 @@
-from utils.aws_clients import table
 from utils.logger import get_logger
-from utils.http import respond
+from utils.http import respond, respond_serialized, EnhancedJSONEncoder
+from utils.email_templates import (
+    SUMMARY_FIELDS,
+    apply_stream_records,
+    decompress_body,
+    get_templates_by_ids,
+    query_templates_for_profile,
+    routing_profiles,
+)
+from utils.cache import CACHE_TABLE_NAME, DynamoStore
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
 from decimal import Decimal
+import hashlib
 import os
 import json
+import threading
+import time
+import uuid
 
 # ---------------------------------------------------------------------------
 # Logger and environment setup
 # ---------------------------------------------------------------------------
 logger = get_logger(__name__)
 
-# ---------------------------------------------------------------------------
-# DynamoDB table (from env)
-# ---------------------------------------------------------------------------
-EMAIL_TEMPLATES_TABLE = table("DDB_TABLE_TECO_EMAIL_TEMPLATES", "teco_email_templates")
+# Serialized response per routing profile and view: {(profile, view): {"body", "etag", "timestamp"}}
+EMAIL_TEMPLATE_CACHE_TTL = int(os.getenv("EMAIL_TEMPLATE_CACHE_TTL", "60"))
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+# Per-profile version marker in the shared cache table (DDB_TABLE_TECO_CACHE).
+# The stream handler bumps it; every container compares it on read, so a
+# template change is visible everywhere at once. Without the table, cached
+# responses only refresh after EMAIL_TEMPLATE_CACHE_TTL.
+_VERSIONS = DynamoStore(CACHE_TABLE_NAME) if CACHE_TABLE_NAME else None
+VERSION_RETENTION_SECONDS = 30 * 86400
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -33,38 +51,147 @@ def _json_safe(obj):
     return obj
 
 
+def _header(headers, name):
+    for k, v in (headers or {}).items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+def _version_key(routing_profile_name):
+    return f"email-template-version:{routing_profile_name}"
+
+
+def _profile_version(routing_profile_name):
+    """Shared change marker for a profile (None without the shared table or on error)."""
+    if _VERSIONS is None:
+        return None
+    try:
+        return _VERSIONS.read(_version_key(routing_profile_name))
+    except Exception as e:
+        logger.warning(f"[CACHE] Version read failed for {routing_profile_name}: {e}")
+        return None
+
+
+def _bump_profile_versions(profiles):
+    if _VERSIONS is None:
+        return
+    marker = uuid.uuid4().hex.encode("utf-8")
+    for profile in profiles:
+        try:
+            _VERSIONS.write(_version_key(profile), marker, time.time() + VERSION_RETENTION_SECONDS)
+        except Exception as e:
+            logger.warning(f"[CACHE] Version bump failed for {profile}: {e}")
+
+
+def _cached_response(cache_key, version):
+    with _CACHE_LOCK:
+        entry = _CACHE.get(cache_key)
+    if (entry and time.time() - entry["timestamp"] < EMAIL_TEMPLATE_CACHE_TTL
+            and entry["version"] == version):
+        return entry
+    return None
+
+
+def _store_response(cache_key, payload, version):
+    body = json.dumps(payload, cls=EnhancedJSONEncoder)
+    entry = {
+        "body": body,
+        "etag": '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"',
+        "timestamp": time.time(),
+        "version": version,
+    }
+    with _CACHE_LOCK:
+        _CACHE[cache_key] = entry
+    return entry
+
+
+def invalidate_email_template_cache(profiles=None):
+    """Drop cached responses for the given routing profiles (all when None)."""
+    with _CACHE_LOCK:
+        if profiles is None:
+            _CACHE.clear()
+        else:
+            for key in [k for k in _CACHE if k[0] in profiles]:
+                _CACHE.pop(key, None)
+
+
 # ---------------------------------------------------------------------------
 # Handler
 # ---------------------------------------------------------------------------
-def handle_get_email_template_app(path_params: dict):
+def _fetch_payload(routing_profile_name, view):
+    fields = SUMMARY_FIELDS if view == "summary" else None
+    items = query_templates_for_profile(routing_profile_name, fields)
+    if fields is None:
+        items = [decompress_body(t) for t in items]
+    items.sort(key=lambda x: (x.get("template_name") or "").lower())
+    safe_items = _json_safe(items)
+
+    logger.info(f"[GET SUCCESS] Found {len(safe_items)} templates for routingProfile={routing_profile_name} (view={view})")
+    return {
+        "name": routing_profile_name,
+        "view": view,
+        "templates": safe_items
+    }
+
+
+def _fetch_details(routing_profile_name, template_ids):
+    """Full templates by id, restricted to those published to the routing profile."""
+    items = [
+        decompress_body(t) for t in get_templates_by_ids(template_ids)
+        if routing_profile_name in routing_profiles(t)
+    ]
+    logger.info(f"[GET DETAIL] {len(items)}/{len(template_ids)} templates for routingProfile={routing_profile_name}")
+    return {
+        "name": routing_profile_name,
+        "view": "detail",
+        "templates": _json_safe(items)
+    }
+
+
+def handle_get_email_template_app(path_params: dict, headers: dict = None, query_params: dict = None):
     """
-    Fetches all email templates from DynamoDB filtered by routing profile.
+    Fetches email templates published to a routing profile.
     API route example: GET /email-templates/{routingProfile}
+
+    Query parameters:
+        view=summary        -> picker list (id, name, subject, updated-at) only
+        templateIds=a,b,c   -> full templates by id (BatchGetItem)
+
+    List responses are cached per routing profile with a content-hash ETag;
+    a matching If-None-Match returns 304 without a body.
     """
 
     routing_profile_name = path_params.get("routingProfile")
+    query_params = query_params or {}
+    view = "summary" if query_params.get("view") == "summary" else "full"
+    template_ids = [t.strip() for t in (query_params.get("templateIds") or "").split(",") if t.strip()]
 
     if not routing_profile_name:
         logger.warning("Missing 'routingProfile' path parameter")
         return respond(400, {"error": "BadRequest", "message": "'routingProfile' is required"})
 
     try:
-        logger.info(f"[GET] Fetching email templates for routingProfile={routing_profile_name}")
-
-        response = EMAIL_TEMPLATES_TABLE.scan(
-            FilterExpression=Attr("routing_profile").contains(routing_profile_name)
-        )
-
-        items = response.get("Items", [])
-        items.sort(key=lambda x: (x.get("template_name") or "").lower())
-        safe_items = _json_safe(items)
-
-        logger.info(f"[GET SUCCESS] Found {len(safe_items)} templates for routingProfile={routing_profile_name}")
-
-        return respond(200, {
-            "name": routing_profile_name,
-            "templates": safe_items
-        })
+        if template_ids:
+            return respond(200, _fetch_details(routing_profile_name, template_ids))
+
+        cache_key = (routing_profile_name, view)
+        version = _profile_version(routing_profile_name)
+        entry = _cached_response(cache_key, version)
+        if entry:
+            logger.info(f"[CACHE] Email templates for routingProfile={routing_profile_name} (view={view})")
+        else:
+            logger.info(f"[GET] Fetching email templates for routingProfile={routing_profile_name} (view={view})")
+            entry = _store_response(cache_key, _fetch_payload(routing_profile_name, view), version)
+
+        cache_headers = {
+            "ETag": entry["etag"],
+            "Cache-Control": f"private, max-age={EMAIL_TEMPLATE_CACHE_TTL}",
+            "Access-Control-Expose-Headers": "ETag",
+        }
+        if _header(headers, "if-none-match") == entry["etag"]:
+            return respond_serialized(304, "", cache_headers)
+        return respond_serialized(200, entry["body"], cache_headers)
 
     except ClientError as e:
         err = e.response.get("Error", {})
@@ -97,3 +224,16 @@ def handle_get_email_template_app(path_params: dict):
             "error": "InternalServerError",
             "message": str(e)
         })
+
+
+# ---------------------------------------------------------------------------
+# Stream handler (templates table -> routing profile index)
+# ---------------------------------------------------------------------------
+def handle_email_template_stream(event: dict):
+    """Keeps the routing-profile index in sync with the templates table stream."""
+    records = event.get("Records", [])
+    affected = apply_stream_records(records)
+    invalidate_email_template_cache(affected)
+    _bump_profile_versions(affected)
+    logger.info(f"[STREAM] Applied {len(records)} record(s), {len(affected)} routing profile(s) affected")
+    return {"processed": len(records)}
@@ -1,8 +1,12 @@
 from utils.logger import get_logger
 from utils.http import respond
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import os
 import json
+import threading
+import time
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -19,6 +23,56 @@ S3 = boto3.client("s3")
 # ---------------------------------------------------------------------------
 AGENT_GREETING_BUCKET = os.getenv("AGENT_GREETING_BUCKET")
 PRESIGNED_URL_EXPIRY_TIME = int(os.getenv("PRESIGNED_URL_EXPIRY_TIME", "3600"))  # Default: 1 hour
+# Reuse a signed URL until it has less than this many seconds left
+PRESIGNED_URL_REUSE_MARGIN = int(os.getenv("PRESIGNED_URL_REUSE_MARGIN", "300"))
+
+BATCH_MAX_USERS = 200
+BATCH_LIST_WORKERS = 8
+
+# {(key, etag): (url, expires_at)}; the ETag rolls the URL when a greeting is replaced
+_URLS = {}
+_URLS_LOCK = threading.Lock()
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _greeting_key(username: str, language: str) -> str:
+    return f"agent-greetings/{username}/{language}/agent_greeting.wav"
+
+
+def _presigned_url(key: str, etag: str = None) -> tuple:
+    """(url, expires_at epoch seconds); a cached URL keeps its original expiry."""
+    now = time.time()
+    with _URLS_LOCK:
+        cached = _URLS.get((key, etag))
+    if cached and cached[1] - now > PRESIGNED_URL_REUSE_MARGIN:
+        return cached
+
+    url = S3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": AGENT_GREETING_BUCKET, "Key": key},
+        ExpiresIn=PRESIGNED_URL_EXPIRY_TIME
+    )
+    with _URLS_LOCK:
+        # Drop expired entries so the map stays bounded by live greetings
+        for k in [k for k, (_, exp) in _URLS.items() if exp <= now]:
+            del _URLS[k]
+        _URLS[(key, etag)] = (url, now + PRESIGNED_URL_EXPIRY_TIME)
+    return url, now + PRESIGNED_URL_EXPIRY_TIME
+
+
+def _expires_in(expires_at: float) -> int:
+    return max(int(expires_at - time.time()), 0)
+
+
+def _list_user_greetings(username: str) -> dict:
+    """All greeting objects for one user, {key: object}, with one paginated listing."""
+    found = {}
+    paginator = S3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=AGENT_GREETING_BUCKET, Prefix=f"agent-greetings/{username}/"):
+        for obj in page.get("Contents", []):
+            found[obj["Key"]] = obj
+    return found
 
 # ---------------------------------------------------------------------------
 # Handler
@@ -46,15 +100,11 @@ def handle_get_greetings(username: str, language: str):
         key = f"agent-greetings/{username}/{language}/agent_greeting.wav"
         logger.info(f"[GET GREETING] Generating presigned URL for key: {key}")
 
-        presigned_url = S3.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": AGENT_GREETING_BUCKET, "Key": key},
-            ExpiresIn=PRESIGNED_URL_EXPIRY_TIME
-        )
+        presigned_url, expires_at = _presigned_url(key)
 
         logger.info(f"[SUCCESS] Presigned URL generated for user={username}, language={language}")
 
-        return respond(200, {"presignedUrl": presigned_url})
+        return respond(200, {"presignedUrl": presigned_url, "expiresIn": _expires_in(expires_at)})
 
     except Exception as e:
         logger.exception("[ERROR] Failed to generate presigned URL")
@@ -62,3 +112,70 @@ def handle_get_greetings(username: str, language: str):
             "error": "InternalServerError",
             "message": str(e)
         })
+
+
+def handle_post_greetings_batch(body: dict):
+    """
+    Greeting status and playback URLs for many agents in one call.
+
+    Expected JSON body:
+    {
+        "usernames": ["john.doe", "jane.roe"],
+        "languages": ["en", "fr"]
+    }
+
+    Existence comes from one list_objects_v2 per username prefix (not a
+    head_object per pair); URLs are reused until they near expiry, so each
+    row reports its own remaining `expiresIn` and the top-level value is the
+    shortest of them.
+    """
+
+    usernames = list(dict.fromkeys(u for u in body.get("usernames") or [] if isinstance(u, str) and u))
+    languages = list(dict.fromkeys(l for l in body.get("languages") or [] if isinstance(l, str) and l))
+
+    if not usernames or not languages:
+        logger.warning("Missing 'usernames' or 'languages' in batch request")
+        return respond(400, {
+            "error": "BadRequest",
+            "message": "Non-empty 'usernames' and 'languages' arrays are required."
+        })
+    if len(usernames) > BATCH_MAX_USERS:
+        return respond(400, {"error": "BadRequest", "message": f"At most {BATCH_MAX_USERS} usernames per request."})
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(BATCH_LIST_WORKERS, len(usernames))) as executor:
+            listings = dict(zip(usernames, executor.map(_list_user_greetings, usernames)))
+
+        results = []
+        for username in usernames:
+            for language in languages:
+                key = _greeting_key(username, language)
+                obj = listings[username].get(key)
+                row = {"username": username, "language": language, "exists": obj is not None}
+                if obj:
+                    url, expires_at = _presigned_url(key, obj.get("ETag"))
+                    row.update({
+                        "presignedUrl": url,
+                        "expiresIn": _expires_in(expires_at),
+                        "size": obj.get("Size"),
+                        "lastModified": obj.get("LastModified"),
+                    })
+                results.append(row)
+
+        logger.info(f"[BATCH GREETINGS] {sum(r['exists'] for r in results)}/{len(results)} greetings found")
+        expires_in = min((r["expiresIn"] for r in results if r["exists"]), default=PRESIGNED_URL_EXPIRY_TIME)
+        return respond(200, {"results": results, "expiresIn": expires_in})
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[ERROR] Failed batch greeting lookup")
+        return respond(500, {
+            "error": "InternalServerError",
+            "message": str(e)
+        })
@@ -0,0 +1,111 @@
+from utils.logger import get_logger
+from utils.http import respond
+from utils.predefined_attributes import get_predefined_attribute_catalog
+from botocore.exceptions import ClientError
+from bisect import bisect_left
+import os
+import threading
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+INSTANCE_ID = os.getenv("CONNECT_INSTANCE_ID")
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Prefix index, rebuilt only when the shared catalog object is replaced
+_INDEX = {"catalog": None, "all": None, "byAttribute": {}}
+_INDEX_LOCK = threading.Lock()
+
+# ---------------------------------------------------------------------------
+# Prefix index (sorted arrays + bisect)
+# ---------------------------------------------------------------------------
+def _sorted_entries(pairs):
+    """Return (keys, entries) sorted by case-folded value for prefix bisects."""
+    entries = sorted(pairs, key=lambda p: (p[1].lower(), p[0].lower(), p[1]))
+    return [v.lower() for _, v in entries], entries
+
+
+def _get_index(catalog):
+    with _INDEX_LOCK:
+        if _INDEX["catalog"] is not catalog:
+            by_attr = {}
+            for name, detail in catalog.items():
+                by_attr[name.lower()] = _sorted_entries((name, v) for v in detail.get("values") or [])
+            _INDEX.update({
+                "catalog": catalog,
+                "all": _sorted_entries((n, v) for n, d in catalog.items() for v in d.get("values") or []),
+                "byAttribute": by_attr,
+            })
+            logger.info(f"[INDEX] Built prefix index over {len(_INDEX['all'][0])} values")
+        return _INDEX["all"], _INDEX["byAttribute"]
+
+
+def _prefix_range(keys, prefix):
+    lo = bisect_left(keys, prefix)
+    hi = bisect_left(keys, prefix + "\U0010ffff", lo)
+    return lo, hi
+
+
+def _int_param(params, name, default, lo, hi):
+    try:
+        return max(lo, min(hi, int(params.get(name, default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# ---------------------------------------------------------------------------
+# Handler
+# ---------------------------------------------------------------------------
+def handle_get_predefined_attribute_search(query_params: dict):
+    """
+    Typeahead over predefined attribute values.
+    Route: GET /admin-configuration/predefined-attributes/search?q=&attribute=&limit=&offset=
+    """
+    params = query_params or {}
+    prefix = (params.get("q") or "").strip().lower()
+    attribute = (params.get("attribute") or "").strip()
+    limit = _int_param(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    offset = _int_param(params, "offset", 0, 0, 10 ** 9)
+
+    try:
+        all_index, by_attr = _get_index(get_predefined_attribute_catalog(INSTANCE_ID))
+
+        if attribute:
+            keys, entries = by_attr.get(attribute.lower(), ([], []))
+        else:
+            keys, entries = all_index
+
+        lo, hi = _prefix_range(keys, prefix)
+        start = min(lo + offset, hi)
+        end = min(start + limit, hi)
+        matches = [{"attribute": a, "value": v} for a, v in entries[start:end]]
+        total = hi - lo
+
+        logger.info(f"[SEARCH] q='{prefix}' attribute='{attribute}' -> {total} match(es)")
+        return respond(200, {
+            "query": prefix,
+            "attribute": attribute or None,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "nextOffset": offset + len(matches) if end < hi else None,
+            "results": matches,
+        })
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[UNHANDLED ERROR] While searching predefined attributes")
+        return respond(500, {"error": "InternalServerError", "message": str(e)})
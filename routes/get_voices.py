@@ -1,7 +1,10 @@
 from utils.logger import get_logger
 from utils.http import respond
+from utils.cache import TieredCache
 import boto3
 import json
+import os
+import threading
 from botocore.exceptions import ClientError
 
 # ---------------------------------------------------------------------------
@@ -10,10 +13,21 @@ from botocore.exceptions import ClientError
 logger = get_logger(__name__)
 POLLY = boto3.client("polly")
 
+# Voice catalog rarely changes; share it across containers via the L2 cache
+VOICE_CATALOG_TTL = int(os.getenv("VOICE_CATALOG_TTL", "86400"))
+_VOICES = TieredCache("polly-voices", ttl=VOICE_CATALOG_TTL)
+
+# Filter index, rebuilt only when the cached catalog object is replaced
+_INDEX = {"catalog": None, "language": {}, "engine": {}, "gender": {}}
+_INDEX_LOCK = threading.Lock()
+
+# view=compact projection; any other subset can be requested with fields=
+COMPACT_FIELDS = ["Id", "Name", "Gender", "LanguageCode", "SupportedEngines"]
+
 # ---------------------------------------------------------------------------
 # Helper: List supported voices
 # ---------------------------------------------------------------------------
-def get_supported_voices():
+def _describe_all_voices():
 
     voices = []
     try:
@@ -25,15 +39,79 @@ def get_supported_voices():
         raise
     return voices
 
+
+def get_supported_voices():
+    return _VOICES.get_or_load("all", _describe_all_voices)
+
+# ---------------------------------------------------------------------------
+# Index: language / engine / gender -> voice positions
+# ---------------------------------------------------------------------------
+def _get_index(voices):
+    with _INDEX_LOCK:
+        if _INDEX["catalog"] is not voices:
+            language, engine, gender = {}, {}, {}
+            for i, voice in enumerate(voices):
+                for code in [voice.get("LanguageCode")] + (voice.get("AdditionalLanguageCodes") or []):
+                    if code:
+                        language.setdefault(code.lower(), set()).add(i)
+                for name in voice.get("SupportedEngines") or []:
+                    engine.setdefault(name.lower(), set()).add(i)
+                if voice.get("Gender"):
+                    gender.setdefault(voice["Gender"].lower(), set()).add(i)
+            _INDEX.update({"catalog": voices, "language": language, "engine": engine, "gender": gender})
+            logger.info(f"[INDEX] Indexed {len(voices)} voices")
+        return _INDEX
+
+
+def _csv(value):
+    return [v.strip().lower() for v in (value or "").split(",") if v.strip()]
+
+
+def filter_voices(voices, query_params):
+    """
+    Voices matching every given filter (each accepts comma-separated values):
+    language (LanguageCode or AdditionalLanguageCodes), engine, gender.
+    """
+    index = _get_index(voices)
+    selected = None
+    for param, dimension in (("language", "language"), ("engine", "engine"), ("gender", "gender")):
+        wanted = _csv(query_params.get(param))
+        if not wanted:
+            continue
+        matches = set().union(*(index[dimension].get(w, set()) for w in wanted))
+        selected = matches if selected is None else selected & matches
+    if selected is None:
+        return list(voices)
+    return [voices[i] for i in sorted(selected)]
+
+
+def _project(voices, query_params):
+    if query_params.get("view") == "compact":
+        fields = COMPACT_FIELDS
+    else:
+        fields = [f.strip() for f in (query_params.get("fields") or "").split(",") if f.strip()]
+    if not fields:
+        return voices
+    return [{f: v[f] for f in fields if f in v} for v in voices]
+
 # ---------------------------------------------------------------------------
 # Handler
 # ---------------------------------------------------------------------------
-def handle_get_voices():
+def handle_get_voices(query_params: dict = None):
+    """
+    Lists Polly voices from the cached catalog.
+
+    Query parameters (all optional):
+        language=en-US,en-GB   engine=neural   gender=Female
+        view=compact           -> Id, Name, Gender, LanguageCode, SupportedEngines
+        fields=Id,Name         -> explicit projection
+    """
     
     logger.info("[REQUEST] Handling get voices request")
+    query_params = query_params or {}
 
     try:
-        voices = get_supported_voices()
+        voices = _project(filter_voices(get_supported_voices(), query_params), query_params)
         logger.info(f"[SUCCESS] Retrieved {len(voices)} voices from Polly")
 
         return respond(200, {"voices": voices})
@@ -1,8 +1,10 @@
 from utils.aws_clients import ddb as DDB, connect as CONNECT, table
 from utils.logger import get_logger
 from utils.http import respond
+from utils.cache import TieredCache
 import os
 import re
+import time
 import json
 import decimal
 from datetime import datetime, date
@@ -27,6 +29,11 @@ TABLE_PROFILES = os.environ["DDB_TABLE_TECO_PROFICIENCY_PROFILE_US_EAST_1_DEV"]
 mapping_table = dynamodb.Table(TABLE_MAPPING)
 profile_table = dynamodb.Table(TABLE_PROFILES)
 
+# Hierarchy index: {hierarchy_group_id: ["Level / Level / Leaf", resolved_at]}
+# Each path expires on its own; appending a group must not extend the others.
+HIERARCHY_TTL = 900
+_HIERARCHY = TieredCache("hierarchy-index", ttl=HIERARCHY_TTL)
+
 # ---------------------------------------------------------------------------
 # JSON Encoder
 # ---------------------------------------------------------------------------
@@ -78,6 +85,24 @@ def build_hierarchy_path(group_id: str) -> str:
         return "-"
 
 
+def _load_hierarchy_index():
+    """Return (index, pruned): the cached paths still within HIERARCHY_TTL."""
+    cached = (_HIERARCHY.get_entry(INSTANCE_ID) or ({},))[0] or {}
+    cutoff = time.time() - HIERARCHY_TTL
+    index = {gid: v for gid, v in cached.items() if isinstance(v, list) and len(v) == 2 and v[1] > cutoff}
+    return index, len(index) != len(cached)
+
+
+def _hierarchy_path(group_id: str, index: dict) -> str:
+    """Resolve a hierarchy path through the index, describing only on a miss."""
+    if group_id not in index:
+        path = build_hierarchy_path(group_id)
+        if path == "-":
+            return path  # don't cache failures
+        index[group_id] = [path, time.time()]
+    return index[group_id][0]
+
+
 # ---------------------------------------------------------------------------
 # Proficiency Normalization Helpers
 # ---------------------------------------------------------------------------
@@ -242,6 +267,8 @@ def handle_agent_proficiency_assignment(body):
             agents = []
             mappings = mapping_table.scan().get("Items", [])
             map_by_login = {m["agent_login"]: m for m in mappings}
+            hierarchy_index, pruned = _load_hierarchy_index()
+            known_groups = len(hierarchy_index)
 
             paginator = connect.get_paginator("list_users")
             for page in paginator.paginate(InstanceId=INSTANCE_ID):
@@ -252,7 +279,7 @@ def handle_agent_proficiency_assignment(body):
                     ident = user_detail.get("IdentityInfo", {}) or {}
                     full_name = f"{ident.get('FirstName','').strip()} {ident.get('LastName','').strip()}".strip() or username
                     gid = user_detail.get("HierarchyGroupId")
-                    hierarchy = build_hierarchy_path(gid) if gid else "-"
+                    hierarchy = _hierarchy_path(gid, hierarchy_index) if gid else "-"
 
                     mapping = map_by_login.get(username, {})
                     agents.append({
@@ -264,6 +291,9 @@ def handle_agent_proficiency_assignment(body):
                         "hierarchy_group_id": gid or ""
                     })
 
+            if pruned or len(hierarchy_index) != known_groups:
+                _HIERARCHY.set(INSTANCE_ID, hierarchy_index)
+
             return respond(200, {"agents": agents})
 
         # ---------- CREATE ----------
@@ -1,8 +1,12 @@
 from utils.aws_clients import ddb as DDB, connect as CONNECT
 from utils.logger import get_logger
 from utils.http import respond
-import os, json, uuid, time
-from datetime import timezone
+from utils.predefined_attributes import (
+    get_predefined_attribute_catalog,
+    flatten_proficiencies,
+    sorted_attributes,
+)
+import os, json, uuid
 from botocore.exceptions import ClientError
 
 logger = get_logger(__name__)
@@ -14,55 +18,17 @@ REGION = os.environ.get("AWS_REGION", "us-east-1")
 PROFILE_TABLE = os.environ["DDB_TABLE_TECO_PROFICIENCY_PROFILE_US_EAST_1_DEV"]
 profile_table = dynamodb.Table(PROFILE_TABLE)
 
-_CACHE = {"timestamp": 0, "ttl": 300, "data": None}
-
 # ---------------------------------------------------------------------------
 # CONNECT ATTRIBUTE HELPERS
 # ---------------------------------------------------------------------------
 
-def _paginate_list_predefined_attributes(instance_id):
-    paginator = connect.get_paginator("list_predefined_attributes")
-    for page in paginator.paginate(InstanceId=instance_id):
-        for s in page.get("PredefinedAttributeSummaryList", []):
-            yield s
-
-
-def _describe_attribute(instance_id, name):
-    try:
-        resp = connect.describe_predefined_attribute(InstanceId=instance_id, Name=name)
-        pa = resp.get("PredefinedAttribute", {}) or {}
-        values = (pa.get("Values") or {}).get("StringList", [])
-        return {"name": pa.get("Name") or name, "values": values}
-    except ClientError as e:
-        err = e.response.get("Error", {}).get("Message", str(e))
-        logger.warning(f"Failed to describe attribute '{name}': {err}")
-        return {"name": name, "values": []}
-
-
-def _fetch_predefined_proficiencies():
-    """Return flattened list of proficiencies like Attribute=Value (Lx)."""
-    attributes, combined = [], []
-    index = 1
-    for summary in _paginate_list_predefined_attributes(INSTANCE_ID):
-        name = summary.get("Name")
-        if not name:
-            continue
-        detail = _describe_attribute(INSTANCE_ID, name)
-        attributes.append(detail)
-        for val in detail["values"] or []:
-            combined.append(f"{detail['name']}={val} (L{index})")
-            index += 1
-    combined.sort(key=lambda x: x.lower())
-    return {"proficiencies": combined, "rawAttributes": attributes}
-
-
 def _get_cached_predefined_proficiencies():
-    now = time.time()
-    if _CACHE["data"] and (now - _CACHE["timestamp"] < _CACHE["ttl"]):
-        return _CACHE["data"]
-    data = _fetch_predefined_proficiencies()
-    _CACHE.update({"data": data, "timestamp": now})
-    return data
+    """Return flattened list of proficiencies like Attribute=Value (Lx)."""
+    attributes = get_predefined_attribute_catalog(INSTANCE_ID)
+    return {
+        "proficiencies": flatten_proficiencies(attributes),
+        "rawAttributes": [{"name": a["name"], "values": a["values"]} for a in sorted_attributes(attributes)],
+    }
 
 
 # ---------------------------------------------------------------------------
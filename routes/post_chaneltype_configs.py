@@ -1,6 +1,7 @@
 from utils.aws_clients import ddb as DDB, table
 from utils.logger import get_logger
 from utils.http import respond
+from utils.callflow_bundle import invalidate_callflow_bundle
 from boto3.dynamodb.conditions import Key
 import os
 
@@ -15,6 +16,9 @@ dynamodb = DDB
 # ---------------------------------------------------------------------------
 CONFIGS_TABLE_NAME = os.environ["DDB_TABLE_TECO_DYNAMODB_BUSINESS_GROUP_CONFIGS_US_EAST_1_DEV"]
 configs_table = dynamodb.Table(CONFIGS_TABLE_NAME)
+# Optional GSI: partition key business_group_id (S), sort key channel_type (S),
+# projection ALL. When set, list reads only the requested channel's items.
+CONFIGS_CHANNEL_INDEX = os.getenv("DDB_INDEX_CONFIGS_CHANNEL_TYPE")
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -35,6 +39,9 @@ DB_TO_UI = {
 }
 UI_TO_DB = {v: k for k, v in DB_TO_UI.items()}
 REQUEST_ONLY_KEYS = {"action", "businessGroup", "channelType"}
+SORT_KEY = "config_type#channel_type"
+CHANNEL_ATTR = "channel_type"  # derived from the sort key suffix on every write
+GENERIC_CHANNELS = ("voice", "chat")
 
 # ---------------------------------------------------------------------------
 # Helper Functions
@@ -56,6 +63,86 @@ def _from_ui_item(data: dict) -> dict:
     return out
 
 
+def _channel_of(sk) -> str:
+    """'first_hold#voice' -> 'voice' (None when the sort key has no channel suffix)."""
+    if not isinstance(sk, str) or "#" not in sk:
+        return None
+    return sk.rsplit("#", 1)[1]
+
+
+def _is_channel_match(sk: str, ch: str) -> bool:
+    if not isinstance(sk, str):
+        return False
+    if ch == "generic":
+        return any(sk.endswith(f"#{c}") for c in GENERIC_CHANNELS)
+    return sk.endswith(f"#{ch}")
+
+
+def _query_all(**kwargs) -> list:
+    result = configs_table.query(**kwargs)
+    items = result.get("Items", [])
+
+    # Handle pagination
+    while "LastEvaluatedKey" in result:
+        result = configs_table.query(**kwargs, ExclusiveStartKey=result["LastEvaluatedKey"])
+        items.extend(result.get("Items", []))
+    return items
+
+
+def _query_configs(business_group: str, channel_type: str) -> list:
+    """
+    Configs for a business group and channel ('generic' = voice + chat).
+    With the channel_type GSI the filter is part of the KeyConditionExpression;
+    otherwise every item of the business group is read and filtered here.
+    """
+    if CONFIGS_CHANNEL_INDEX:
+        channels = GENERIC_CHANNELS if channel_type == "generic" else (channel_type,)
+        items = []
+        for channel in channels:
+            items.extend(_query_all(
+                IndexName=CONFIGS_CHANNEL_INDEX,
+                KeyConditionExpression=Key("business_group_id").eq(business_group) & Key(CHANNEL_ATTR).eq(channel)
+            ))
+        # Same order as the base-table query (by sort key)
+        return sorted(items, key=lambda it: it.get(SORT_KEY, ""))
+
+    items = _query_all(KeyConditionExpression=Key("business_group_id").eq(business_group))
+    return [it for it in items if _is_channel_match(it.get(SORT_KEY, ""), channel_type)]
+
+
+def backfill_channel_types(dry_run: bool = False) -> dict:
+    """One-time migration: set channel_type on items written before the GSI existed."""
+    stats = {"items": 0, "updated": 0, "skipped": 0}
+    kwargs = {"ProjectionExpression": "business_group_id, #sk, #ch",
+              "ExpressionAttributeNames": {"#sk": SORT_KEY, "#ch": CHANNEL_ATTR}}
+    while True:
+        result = configs_table.scan(**kwargs)
+        for item in result.get("Items", []):
+            stats["items"] += 1
+            channel = _channel_of(item.get(SORT_KEY))
+            if not channel or item.get(CHANNEL_ATTR) == channel:
+                stats["skipped"] += 1
+                continue
+            if not dry_run:
+                try:
+                    configs_table.update_item(
+                        Key={"business_group_id": item["business_group_id"], SORT_KEY: item[SORT_KEY]},
+                        UpdateExpression="SET #ch = :ch",
+                        ConditionExpression="attribute_exists(#sk)",
+                        ExpressionAttributeNames={"#ch": CHANNEL_ATTR, "#sk": SORT_KEY},
+                        ExpressionAttributeValues={":ch": channel}
+                    )
+                except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                    # Deleted since the scan; nothing to migrate
+                    logger.info(f"[MIGRATE] BG={item['business_group_id']}, SK={item[SORT_KEY]} no longer exists, skipped")
+                    stats["skipped"] += 1
+                    continue
+            stats["updated"] += 1
+        if "LastEvaluatedKey" not in result:
+            return stats
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
 # ---------------------------------------------------------------------------
 # Main Handler
 # ---------------------------------------------------------------------------
@@ -74,28 +161,7 @@ def handle_chaneltype_configs(body: dict):
 
             logger.info(f"[LIST] Fetching configs for BG={business_group}, channelType={channel_type}")
 
-            result = configs_table.query(
-                KeyConditionExpression=Key("business_group_id").eq(business_group)
-            )
-            items = result.get("Items", [])
-
-            # Handle pagination
-            while "LastEvaluatedKey" in result:
-                result = configs_table.query(
-                    KeyConditionExpression=Key("business_group_id").eq(business_group),
-                    ExclusiveStartKey=result["LastEvaluatedKey"]
-                )
-                items.extend(result.get("Items", []))
-
-            # Filter by channel type
-            def _is_channel_match(sk: str, ch: str) -> bool:
-                if not isinstance(sk, str):
-                    return False
-                if ch == "generic":
-                    return sk.endswith("#voice") or sk.endswith("#chat")
-                return sk.endswith(f"#{ch}")
-
-            filtered = [it for it in items if _is_channel_match(it.get("config_type#channel_type", ""), channel_type)]
+            filtered = _query_configs(business_group, channel_type)
             logger.info(f"[LIST] Returned {len(filtered)} configs for BG={business_group}")
 
             return respond(200, {"results": [_to_ui_item(it) for it in filtered]})
@@ -109,7 +175,11 @@ def handle_chaneltype_configs(body: dict):
             if not pk or not sk:
                 return respond(400, {"error": "Missing primary keys: 'business_group_id' and 'config_type#channel_type'"})
 
+            item.pop(CHANNEL_ATTR, None)
+            if _channel_of(sk):
+                item[CHANNEL_ATTR] = _channel_of(sk)
             configs_table.put_item(Item=item)
+            invalidate_callflow_bundle(pk, _channel_of(sk))
             logger.info(f"[CREATE] Created config BG={pk}, SK={sk}")
             return respond(200, {"message": "Configuration created successfully"})
 
@@ -123,9 +193,11 @@ def handle_chaneltype_configs(body: dict):
                 return respond(400, {"error": "Missing primary keys: 'business_group_id' and 'config_type#channel_type'"})
 
             # Build update expression
-            to_update = {k: v for k, v in converted.items() if k not in ("business_group_id", "config_type#channel_type")}
+            to_update = {k: v for k, v in converted.items() if k not in ("business_group_id", "config_type#channel_type", CHANNEL_ATTR)}
             if not to_update:
                 return respond(400, {"error": "No attributes provided for update"})
+            if _channel_of(sk):
+                to_update[CHANNEL_ATTR] = _channel_of(sk)
 
             parts, names, values = [], {}, {}
             for i, (k, v) in enumerate(to_update.items()):
@@ -140,6 +212,7 @@ def handle_chaneltype_configs(body: dict):
                 ExpressionAttributeNames=names,
                 ExpressionAttributeValues=values
             )
+            invalidate_callflow_bundle(pk, _channel_of(sk))
 
             logger.info(f"[UPDATE] Updated config BG={pk}, SK={sk}")
             return respond(200, {"message": "Configuration updated successfully"})
@@ -153,6 +226,7 @@ def handle_chaneltype_configs(body: dict):
                 return respond(400, {"error": "Missing primary keys: 'business_group_id' and 'config_type#channel_type'"})
 
             configs_table.delete_item(Key={"business_group_id": pk, "config_type#channel_type": sk})
+            invalidate_callflow_bundle(pk, _channel_of(sk))
             logger.info(f"[DELETE] Deleted config BG={pk}, SK={sk}")
             return respond(200, {"message": "Configuration deleted successfully"})
 
@@ -1,8 +1,17 @@
 from utils.aws_clients import ddb as DDB, table
 from utils.logger import get_logger
 from utils.http import respond
+from utils.callflow_bundle import invalidate_callflow_bundle
+from utils.work_queue import DONE, FAILED, PROCESSING, QUEUED, WorkQueueUnavailable, get_work_queue
+from utils.prompt_audio import (
+    PROMPT_AUDIO_BUCKET,
+    existing_audio_keys,
+    plan_prompt_synthesis,
+    run_prompt_synthesis,
+)
 from boto3.dynamodb.conditions import Key
 import os
+import time
 
 # ---------------------------------------------------------------------------
 # Logging & AWS Clients
@@ -21,6 +30,11 @@ prompts_table = dynamodb.Table(PROMPTS_TABLE_NAME)
 # ---------------------------------------------------------------------------
 REQUEST_ONLY_KEYS = {"action", "businessGroup", "channelType"}
 
+# Batch pre-synthesis (action=synthesize) runs from the scheduled drain
+SYNTHESIS_QUEUE = "prompt-synthesis"
+SYNTHESIS_TIME_BUDGET = int(os.getenv("PROMPT_SYNTHESIS_TIME_BUDGET", "600"))  # seconds per drain
+SYNTHESIS_MAX_ATTEMPTS = 5
+
 # ---------------------------------------------------------------------------
 # Helper Functions
 # ---------------------------------------------------------------------------
@@ -38,6 +52,150 @@ def _clean_for_put(item: dict) -> dict:
     return cleaned
 
 
+def _query_prompts(business_group: str, channel_type: str) -> list:
+    """All prompts for a business group (and channel, unless 'generic') via the GSI."""
+    key_condition = Key("business_group_id").eq(business_group)
+    if channel_type != "generic":
+        key_condition = key_condition & Key("channel").eq(channel_type)
+
+    result = prompts_table.query(
+        IndexName="business_group_id-channel-index",
+        KeyConditionExpression=key_condition
+    )
+    items = result.get("Items", [])
+
+    # Handle pagination
+    while "LastEvaluatedKey" in result:
+        result = prompts_table.query(
+            IndexName="business_group_id-channel-index",
+            KeyConditionExpression=key_condition,
+            ExclusiveStartKey=result["LastEvaluatedKey"]
+        )
+        items.extend(result.get("Items", []))
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Batch pre-synthesis
+# ---------------------------------------------------------------------------
+def _enqueue_synthesis(body: dict, business_group: str, channel_type: str):
+    if not business_group or not channel_type or not body.get("voice"):
+        return respond(400, {"error": "'businessGroup', 'channelType' and 'voice' are required"})
+    if not PROMPT_AUDIO_BUCKET:
+        return respond(400, {"error": "Prompt pre-synthesis requires PROMPT_AUDIO_BUCKET"})
+
+    ticket_id = get_work_queue().enqueue(SYNTHESIS_QUEUE, {
+        "businessGroup": business_group,
+        "channelType": channel_type,
+        "defaults": {
+            "voice": body["voice"],
+            "engine": body.get("engine", "neural"),
+            "language_code": body.get("language_code", "en-US"),
+            "output_format": body.get("output_format", "mp3"),
+        },
+    })
+    logger.info(f"[SYNTHESIZE] Queued pre-synthesis for BG={business_group}, channelType={channel_type}: {ticket_id}")
+    return respond(202, {"message": "Prompt synthesis queued", "ticketId": ticket_id, "status": QUEUED})
+
+
+def _record_audio_keys(results):
+    """
+    Point each prompt item at its current audio object. Prompts deleted while
+    the job ran are left deleted rather than recreated as key-only items.
+    Returns the rows that were recorded.
+    """
+    recorded = []
+    for row in results:
+        if row.get("key") and row.get("callflowName"):
+            try:
+                prompts_table.update_item(
+                    Key={"callflow_name": row["callflowName"], "prompt_id": row["promptId"]},
+                    UpdateExpression="SET audio_s3_key = :k",
+                    ConditionExpression="attribute_exists(prompt_id)",
+                    ExpressionAttributeValues={":k": row["key"]}
+                )
+            except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                logger.info(f"[SYNTHESIZE] {row['callflowName']}/{row['promptId']} was deleted, audio key not recorded")
+                continue
+            recorded.append(row)
+    return recorded
+
+
+def drain_prompt_synthesis(max_tickets: int = 1, deadline: float = None):
+    """
+    Work queued pre-synthesis jobs (scheduled invocation) until `deadline`
+    (epoch seconds; never later than PROMPT_SYNTHESIS_TIME_BUDGET from now).
+    Progress is written to the ticket as prompts complete; a job that runs out
+    of time is re-queued and resumes where it stopped (existing audio is
+    skipped).
+    """
+    try:
+        queue = get_work_queue()
+    except WorkQueueUnavailable as e:
+        logger.warning(f"[SYNTHESIZE] Drain skipped: {e}")
+        return {"tickets": 0, "skipped": str(e)}
+    now = time.time()
+    deadline = min(deadline or now + SYNTHESIS_TIME_BUDGET, now + SYNTHESIS_TIME_BUDGET)
+    tickets = queue.claim(SYNTHESIS_QUEUE, max_tickets, lease=deadline - now + 120)
+    summary = {"tickets": len(tickets)}
+
+    for ticket in tickets:
+        job = ticket["payload"]
+        bg, channel = job["businessGroup"], job["channelType"]
+        previous = ticket["result"] or {}
+
+        items = _query_prompts(bg, channel)
+        jobs, skipped = plan_prompt_synthesis(items, bg, channel, job["defaults"], existing_audio_keys(bg, channel))
+        logger.info(f"[SYNTHESIZE] {ticket['ticketId']}: {len(jobs)} to synthesize, {len(skipped)} skipped")
+
+        def progress(results, remaining=None, failures=None):
+            synthesized = [r for r in results if r.get("key")]
+            return {
+                "businessGroup": bg,
+                "channelType": channel,
+                "total": len(items),
+                "planned": len(jobs),
+                "synthesized": previous.get("synthesized", 0) + len(synthesized),
+                "completed": len(results),
+                "skipped": len(skipped),
+                "failed": len(results) - len(synthesized),
+                "remaining": len(jobs) - len(results) if remaining is None else len(remaining),
+                "failures": failures if failures is not None else [r for r in results if not r.get("key")],
+            }
+
+        results, remaining = run_prompt_synthesis(
+            jobs,
+            on_progress=lambda r: queue.update(
+                SYNTHESIS_QUEUE, ticket["ticketId"], PROCESSING, progress(r), deadline + 120
+            ),
+            deadline=deadline,
+        )
+        # Unchanged audio whose item still points elsewhere (e.g. an earlier
+        # run that stopped before recording) is re-pointed without synthesis
+        stored = {(i.get("callflow_name"), i.get("prompt_id")): i.get("audio_s3_key") for i in items}
+        stale = [s for s in skipped if s.get("key") and stored.get((s.get("callflowName"), s["promptId"])) != s["key"]]
+        recorded = _record_audio_keys(results + stale)
+        # A 'generic' job touches prompts of every channel; drop each one's bundle
+        written = {(r["callflowName"], r["promptId"]) for r in recorded}
+        if written:
+            invalidate_callflow_bundle(bg, channel, *{
+                item.get("channel") for item in items
+                if (item.get("callflow_name"), item.get("prompt_id")) in written
+            })
+
+        failures = [r for r in results if not r.get("key")]
+        if remaining:
+            status, next_attempt = QUEUED, None  # out of time: continue on the next drain
+        elif failures and all(f.get("retryable") for f in failures) and ticket["attempts"] < SYNTHESIS_MAX_ATTEMPTS:
+            status, next_attempt = QUEUED, time.time() + min(2 ** ticket["attempts"] * 30, 900)
+        else:
+            status, next_attempt = (FAILED if failures else DONE), None
+        queue.update(SYNTHESIS_QUEUE, ticket["ticketId"], status, progress(results, remaining, failures), next_attempt)
+        summary[ticket["ticketId"]] = status
+        logger.info(f"[SYNTHESIZE] {ticket['ticketId']}: {len(results) - len(failures)} synthesized -> {status}")
+    return summary
+
+
 # ---------------------------------------------------------------------------
 # Main Handler
 # ---------------------------------------------------------------------------
@@ -57,34 +215,7 @@ def handle_chaneltype_prompts(body: dict):
 
             logger.info(f"[LIST] Fetching prompts for BG={business_group}, channelType={channel_type}")
 
-            # Query using GSI
-            if channel_type == "generic":
-                result = prompts_table.query(
-                    IndexName="business_group_id-channel-index",
-                    KeyConditionExpression=Key("business_group_id").eq(business_group)
-                )
-            else:
-                result = prompts_table.query(
-                    IndexName="business_group_id-channel-index",
-                    KeyConditionExpression=Key("business_group_id").eq(business_group)
-                                         & Key("channel").eq(channel_type)
-                )
-
-            items = result.get("Items", [])
-
-            # Handle pagination
-            while "LastEvaluatedKey" in result:
-                result = prompts_table.query(
-                    IndexName="business_group_id-channel-index",
-                    KeyConditionExpression=(
-                        Key("business_group_id").eq(business_group)
-                        if channel_type == "generic"
-                        else Key("business_group_id").eq(business_group)
-                             & Key("channel").eq(channel_type)
-                    ),
-                    ExclusiveStartKey=result["LastEvaluatedKey"]
-                )
-                items.extend(result.get("Items", []))
+            items = _query_prompts(business_group, channel_type)
 
             # Sanitize keys for frontend compatibility
             clean_items = [{k.replace("#", "_"): v for k, v in item.items()} for item in items]
@@ -92,6 +223,16 @@ def handle_chaneltype_prompts(body: dict):
 
             return respond(200, {"results": clean_items})
 
+        # ---------- BATCH PRE-SYNTHESIS ----------
+        elif action == "synthesize":
+            return _enqueue_synthesis(body, business_group, channel_type)
+
+        elif action == "synthesisStatus":
+            ticket = get_work_queue().get(body.get("ticketId") or "")
+            if not ticket:
+                return respond(404, {"error": "Unknown ticketId"})
+            return respond(200, ticket)
+
         # ---------- CREATE ----------
         elif action == "create":
             logger.info("[CREATE] Creating new prompt record")
@@ -100,7 +241,10 @@ def handle_chaneltype_prompts(body: dict):
             if not item.get("callflow_name") or not item.get("prompt_id"):
                 return respond(400, {"error": "Missing primary keys: 'callflow_name' and 'prompt_id' are required"})
 
-            prompts_table.put_item(Item=item)
+            # put_item replaces any prompt with the same keys, possibly from another business group/channel
+            old = prompts_table.put_item(Item=item, ReturnValues="ALL_OLD").get("Attributes", {})
+            invalidate_callflow_bundle(old.get("business_group_id"), old.get("channel"))
+            invalidate_callflow_bundle(item.get("business_group_id"), item.get("channel"))
             logger.info(f"[CREATE] Prompt created: {item.get('callflow_name')} - {item.get('prompt_id')}")
             return respond(200, {"message": "Prompt created successfully"})
 
@@ -132,12 +276,17 @@ def handle_chaneltype_prompts(body: dict):
 
             update_expr = "SET " + ", ".join(update_parts)
 
-            prompts_table.update_item(
+            old = prompts_table.update_item(
                 Key={"callflow_name": pk, "prompt_id": sk},
                 UpdateExpression=update_expr,
                 ExpressionAttributeNames=expr_attr_names,
-                ExpressionAttributeValues=expr_attr_values
-            )
+                ExpressionAttributeValues=expr_attr_values,
+                ReturnValues="ALL_OLD"
+            ).get("Attributes", {})
+            # A prompt moved to another business group/channel leaves both bundles stale
+            new = {**old, **cleaned}
+            invalidate_callflow_bundle(old.get("business_group_id"), old.get("channel"))
+            invalidate_callflow_bundle(new.get("business_group_id"), new.get("channel"))
 
             logger.info(f"[UPDATE] Prompt updated: {pk} - {sk}")
             return respond(200, {"message": "Prompt updated successfully"})
@@ -150,7 +299,11 @@ def handle_chaneltype_prompts(body: dict):
             if not pk or not sk:
                 return respond(400, {"error": "Missing primary keys: 'callflow_name' and 'prompt_id' are required"})
 
-            prompts_table.delete_item(Key={"callflow_name": pk, "prompt_id": sk})
+            deleted = prompts_table.delete_item(
+                Key={"callflow_name": pk, "prompt_id": sk},
+                ReturnValues="ALL_OLD"
+            ).get("Attributes", {})
+            invalidate_callflow_bundle(deleted.get("business_group_id"), deleted.get("channel"))
             logger.info(f"[DELETE] Prompt deleted: {pk} - {sk}")
             return respond(200, {"message": "Prompt deleted successfully"})
 
@@ -159,6 +312,10 @@ def handle_chaneltype_prompts(body: dict):
             logger.warning(f"[INVALID] Unsupported action: {action}")
             return respond(400, {"error": f"Unsupported action '{action}'"})
 
+    except WorkQueueUnavailable as e:
+        logger.warning(f"[SYNTHESIZE] {e}")
+        return respond(503, {"error": "ServiceUnavailable", "message": str(e)})
+
     except Exception as e:
         logger.exception("[ERROR] Unhandled exception in handle_chaneltype_prompts")
         return respond(500, {"error": "InternalServerError", "message": str(e)})
@@ -0,0 +1,171 @@
+from utils.logger import get_logger
+from utils.http import respond
+from utils.email_templates import (
+    BODY_FIELD,
+    SUBJECT_FIELD,
+    TEMPLATE_KEY,
+    COMPRESSED_BODY_FIELD,
+    VERSION_FIELD,
+    decompress_body,
+    get_templates_by_ids,
+    routing_profiles,
+)
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+import hashlib
+import html
+import re
+import threading
+
+# ---------------------------------------------------------------------------
+# Logger setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# Placeholders look like {{ Customer_Name }} or {{ Customer_Name | valued customer }}
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z0-9_.\-]+)\s*(?:\|([^}]*))?\}\}")
+
+MAX_COMPILED = 256
+MAX_BATCH = 500
+
+# Compiled templates keyed by (template_id, version): LRU of token lists
+_COMPILED = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+
+# ---------------------------------------------------------------------------
+# Compilation & rendering
+# ---------------------------------------------------------------------------
+def _compile(text):
+    """
+    Split a template into tokens once: literal strings and (name, default)
+    placeholders. Rendering is then a single pass over the token list.
+    """
+    tokens, pos = [], 0
+    for m in PLACEHOLDER_RE.finditer(text or ""):
+        if m.start() > pos:
+            tokens.append(text[pos:m.start()])
+        tokens.append((m.group(1), m.group(2).strip() if m.group(2) is not None else None))
+        pos = m.end()
+    if pos < len(text or ""):
+        tokens.append(text[pos:])
+    return tokens
+
+
+def _render(tokens, variables, escape):
+    out, missing = [], []
+    for tok in tokens:
+        if isinstance(tok, str):
+            out.append(tok)
+            continue
+        name, default = tok
+        value = variables.get(name)
+        if value is None:
+            if default is None:
+                missing.append(name)
+            value = default or ""
+        value = str(value)
+        out.append(html.escape(value) if escape else value)
+    return "".join(out), missing
+
+
+def _version(template):
+    """Template version: its updated-at marker, else a hash of its (possibly compressed) content."""
+    marker = template.get(VERSION_FIELD)
+    if marker:
+        return str(marker)
+    digest = hashlib.sha256(str(template.get(SUBJECT_FIELD) or "").encode("utf-8"))
+    body = template.get(COMPRESSED_BODY_FIELD, template.get(BODY_FIELD)) or ""
+    body = getattr(body, "value", body)
+    digest.update(b"\x00" + (body if isinstance(body, bytes) else str(body).encode("utf-8")))
+    return digest.hexdigest()
+
+
+def _get_compiled(template):
+    key = (template.get(TEMPLATE_KEY), _version(template))
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(key)
+        if compiled:
+            _COMPILED.move_to_end(key)
+            return compiled
+
+    # Only a cache miss pays for decompressing a stored body
+    template = decompress_body(dict(template))
+    compiled = {
+        "subject": _compile(str(template.get(SUBJECT_FIELD) or "")),
+        "body": _compile(str(template.get(BODY_FIELD) or "")),
+    }
+    with _COMPILED_LOCK:
+        _COMPILED[key] = compiled
+        while len(_COMPILED) > MAX_COMPILED:
+            _COMPILED.popitem(last=False)
+    return compiled
+
+
+def _render_one(compiled, variables, escape_html):
+    subject, missing_subject = _render(compiled["subject"], variables, False)
+    body, missing_body = _render(compiled["body"], variables, escape_html)
+    return {
+        "subject": subject,
+        "body": body,
+        "missing": sorted(set(missing_subject) | set(missing_body)),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Handler
+# ---------------------------------------------------------------------------
+def handle_post_email_template_render(body: dict):
+    """
+    Renders an email template server-side.
+    Route: POST /email-template-app/render
+
+    Expected JSON body:
+    {
+        "templateId": "...",
+        "routingProfile": "...",              # optional, restricts access
+        "variables": {"Customer_Name": "..."}, # or "batch": [{...}, {...}]
+        "escapeHtml": true                      # optional, escapes values in the body
+    }
+    """
+    template_id = (body or {}).get("templateId")
+    routing_profile_name = (body or {}).get("routingProfile")
+    batch = (body or {}).get("batch")
+    variables = (body or {}).get("variables") or {}
+    escape_html = (body or {}).get("escapeHtml", True) is not False
+
+    if not template_id:
+        return respond(400, {"error": "BadRequest", "message": "Field 'templateId' is required."})
+    if batch is not None and (not isinstance(batch, list) or not all(isinstance(v, dict) for v in batch)):
+        return respond(400, {"error": "BadRequest", "message": "Field 'batch' must be an array of objects."})
+    if batch is not None and len(batch) > MAX_BATCH:
+        return respond(400, {"error": "BadRequest", "message": f"At most {MAX_BATCH} items per batch."})
+    if not isinstance(variables, dict):
+        return respond(400, {"error": "BadRequest", "message": "Field 'variables' must be an object."})
+
+    try:
+        templates = get_templates_by_ids([template_id])
+        template = templates[0] if templates else None
+        if not template or (routing_profile_name and routing_profile_name not in routing_profiles(template)):
+            return respond(404, {"error": "NotFound", "message": f"Template '{template_id}' not found."})
+
+        compiled = _get_compiled(template)
+
+        if batch is not None:
+            results = [_render_one(compiled, v, escape_html) for v in batch]
+            logger.info(f"[RENDER] Rendered {len(results)} email(s) from template {template_id}")
+            return respond(200, {"templateId": template_id, "results": results})
+
+        result = _render_one(compiled, variables, escape_html)
+        logger.info(f"[RENDER] Rendered template {template_id} ({len(result['missing'])} missing variable(s))")
+        return respond(200, {"templateId": template_id, **result})
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[UNHANDLED ERROR] During email template rendering")
+        return respond(500, {"error": "InternalServerError", "message": str(e)})
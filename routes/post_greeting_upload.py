@@ -0,0 +1,208 @@
+from utils.logger import get_logger
+from utils.http import respond
+from utils.greetings import ENCODINGS, write_greeting
+from utils.s3_stream import READ_CHUNK_SIZE
+from utils.wav import WavError
+from botocore.exceptions import ClientError
+import boto3
+import os
+import re
+import uuid
+
+# ---------------------------------------------------------------------------
+# Logger and AWS setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+S3 = boto3.client("s3")
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+AGENT_GREETING_BUCKET = os.getenv("AGENT_GREETING_BUCKET")
+PRESIGNED_URL_EXPIRY_TIME = int(os.getenv("PRESIGNED_URL_EXPIRY_TIME", "3600"))  # default 1 hour
+GREETING_UPLOAD_EXPIRY = int(os.getenv("GREETING_UPLOAD_EXPIRY", "300"))  # presigned POST lifetime
+GREETING_MAX_BYTES = int(os.getenv("GREETING_MAX_BYTES", str(10 * 1024 * 1024)))  # default 10 MB
+# Staging area for browser uploads; one fixed prefix so an S3 lifecycle rule can expire abandoned uploads
+GREETING_UPLOAD_PREFIX = os.getenv("GREETING_UPLOAD_PREFIX", "agent-greeting-uploads/")
+
+ALLOWED_CONTENT_TYPES = {"audio/wav", "audio/x-wav", "audio/wave"}
+_SAFE_SEGMENT = re.compile(r"^[A-Za-z0-9@._+-]{1,128}$")
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def greeting_key(username: str, language: str) -> str:
+    return f"agent-greetings/{username}/{language}/agent_greeting.wav"
+
+
+def staging_key(username: str, language: str, upload_id: str) -> str:
+    """
+    Browser uploads land here; completion validates and promotes them.
+    Uploads never completed are removed by the bucket's lifecycle rule on
+    GREETING_UPLOAD_PREFIX (see README).
+    """
+    return f"{GREETING_UPLOAD_PREFIX}{username}/{language}/{upload_id}.wav"
+
+
+def _validate_owner(username, language):
+    if not username or not language:
+        return "Both 'username' and 'language' are required."
+    if not _SAFE_SEGMENT.match(username) or not _SAFE_SEGMENT.match(language) or ".." in username + language:
+        return "'username' and 'language' contain unsupported characters."
+    return None
+
+
+def _iter_body(streaming_body):
+    while True:
+        chunk = streaming_body.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+def handle_post_greeting_upload(body: dict):
+    """
+    Starts a direct-to-S3 greeting upload and returns a presigned POST.
+
+    Expected JSON body:
+    {
+        "username": "john.doe",
+        "language": "en",
+        "contentType": "audio/wav"     (optional)
+    }
+
+    The browser POSTs the file with the returned `fields` to `url`; S3
+    enforces the content type and GREETING_MAX_BYTES. Then call
+    /agent-greeting/complete with the returned uploadId.
+    """
+
+    username = body.get("username")
+    language = body.get("language")
+    content_type = body.get("contentType") or "audio/wav"
+
+    # ---------------- Validation ----------------
+    error = _validate_owner(username, language)
+    if error:
+        logger.warning(f"[UPLOAD INIT] {error}")
+        return respond(400, {"error": "BadRequest", "message": error})
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        return respond(400, {
+            "error": "BadRequest",
+            "message": f"'contentType' must be one of: {', '.join(sorted(ALLOWED_CONTENT_TYPES))}."
+        })
+
+    upload_id = uuid.uuid4().hex
+    key = staging_key(username, language, upload_id)
+
+    try:
+        post = S3.generate_presigned_post(
+            Bucket=AGENT_GREETING_BUCKET,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, GREETING_MAX_BYTES],
+            ],
+            ExpiresIn=GREETING_UPLOAD_EXPIRY
+        )
+        logger.info(f"[UPLOAD INIT] User={username}, Lang={language}, Key={key}")
+
+        return respond(200, {
+            "uploadId": upload_id,
+            "url": post["url"],
+            "fields": post["fields"],
+            "expiresIn": GREETING_UPLOAD_EXPIRY,
+            "maxBytes": GREETING_MAX_BYTES
+        })
+
+    except Exception as e:
+        logger.exception("[ERROR] Failed to create presigned POST")
+        return respond(500, {
+            "error": "InternalServerError",
+            "message": str(e)
+        })
+
+
+def handle_post_greeting_complete(body: dict):
+    """
+    Validates an uploaded greeting and stores its telephony transcode (see
+    utils/greetings.py) at agent-greetings/{username}/{language}/agent_greeting.wav.
+    The staging upload is removed. Returns a presigned URL for playback.
+
+    Expected JSON body:
+    {
+        "username": "john.doe",
+        "language": "en",
+        "uploadId": "<id from /agent-greeting/upload>",
+        "encoding": "pcm" | "mulaw"     (optional)
+    }
+    """
+
+    username = body.get("username")
+    language = body.get("language")
+    upload_id = body.get("uploadId") or ""
+    encoding = body.get("encoding")
+
+    # ---------------- Validation ----------------
+    error = _validate_owner(username, language)
+    if not error and not _UPLOAD_ID.match(upload_id):
+        error = "'uploadId' is missing or malformed."
+    if not error and encoding is not None and encoding not in ENCODINGS:
+        error = f"'encoding' must be one of: {', '.join(sorted(ENCODINGS))}."
+    if error:
+        logger.warning(f"[UPLOAD COMPLETE] {error}")
+        return respond(400, {"error": "BadRequest", "message": error})
+
+    source = staging_key(username, language, upload_id)
+    key = greeting_key(username, language)
+
+    try:
+        try:
+            head = S3.head_object(Bucket=AGENT_GREETING_BUCKET, Key=source)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return respond(404, {"error": "NotFound", "message": "No upload found for this uploadId."})
+            raise
+
+        size = head.get("ContentLength", 0)
+        error = "Upload exceeds the size limit." if size > GREETING_MAX_BYTES else None
+        if not error:
+            # Stream the upload through the transcoder into the playback key
+            try:
+                stats = write_greeting(
+                    S3, AGENT_GREETING_BUCKET, key,
+                    _iter_body(S3.get_object(Bucket=AGENT_GREETING_BUCKET, Key=source)["Body"]),
+                    total_size=size, encoding=encoding
+                )
+            except WavError as e:
+                error = str(e)
+
+        S3.delete_object(Bucket=AGENT_GREETING_BUCKET, Key=source)
+        if error:
+            logger.warning(f"[UPLOAD COMPLETE] Rejected {source} ({size} bytes): {error}")
+            return respond(400, {"error": "InvalidAudio", "message": error})
+        logger.info(f"[UPLOAD SUCCESS] Greeting stored in S3: s3://{AGENT_GREETING_BUCKET}/{key} ({size} -> {stats['bytes']} bytes)")
+
+        presigned_url = S3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": AGENT_GREETING_BUCKET, "Key": key},
+            ExpiresIn=PRESIGNED_URL_EXPIRY_TIME
+        )
+        return respond(200, {"presignedUrl": presigned_url, "bytes": stats["bytes"], "sourceBytes": size})
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[ERROR] Failed to complete greeting upload")
+        return respond(500, {
+            "error": "InternalServerError",
+            "message": str(e)
+        })
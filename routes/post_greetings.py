@@ -1,9 +1,12 @@
 from utils.logger import get_logger
 from utils.http import respond
+from utils.s3_stream import b64_decoded_size, iter_b64decode, normalize_b64
+from utils.greetings import ENCODINGS, write_greeting
+from utils.wav import WavError
+import binascii
 import boto3
 import os
 import json
-import base64
 
 # ---------------------------------------------------------------------------
 # Logger and AWS setup
@@ -23,19 +26,23 @@ PRESIGNED_URL_EXPIRY_TIME = int(os.getenv("PRESIGNED_URL_EXPIRY_TIME", "3600"))
 def handle_post_greetings(body: dict):
     """
     Handles uploading an agent greeting (Base64-encoded WAV) to S3 and returns
-    a presigned URL for playback.
+    a presigned URL for playback. The audio is decoded and transcoded to
+    telephony format in chunks straight into S3, so memory does not grow with
+    clip length.
 
     Expected JSON body:
     {
         "username": "john.doe",
         "language": "en",
-        "greeting": "<base64 encoded audio>"
+        "greeting": "<base64 encoded audio>",
+        "encoding": "pcm" | "mulaw"     (optional)
     }
     """
 
     username = body.get("username")
     language = body.get("language")
     greeting_base64 = body.get("greeting")
+    encoding = body.get("encoding")
 
     # ---------------- Validation ----------------
     if not username or not language or not greeting_base64:
@@ -44,23 +51,29 @@ def handle_post_greetings(body: dict):
             "error": "BadRequest",
             "message": "Missing 'username', 'language', or 'greeting' in request body."
         })
+    if not isinstance(greeting_base64, str):
+        return respond(400, {"error": "BadRequest", "message": "'greeting' must be a Base64 string."})
+    if encoding is not None and encoding not in ENCODINGS:
+        return respond(400, {"error": "BadRequest", "message": f"'encoding' must be one of: {', '.join(sorted(ENCODINGS))}."})
 
     key = f"agent-greetings/{username}/{language}/agent_greeting.wav"
     logger.info(f"[UPLOAD] User={username}, Lang={language}, Key={key}")
 
     try:
-        # Decode Base64 audio data
-        audio_bytes = base64.b64decode(greeting_base64)
-        logger.info(f"[UPLOAD] Decoded Base64 audio ({len(audio_bytes)} bytes)")
-
-        # Upload file to S3
-        S3.put_object(
-            Bucket=AGENT_GREETING_BUCKET,
-            Key=key,
-            Body=audio_bytes,
-            ContentType="audio/wav"
-        )
-        logger.info(f"[UPLOAD SUCCESS] Greeting stored in S3: s3://{AGENT_GREETING_BUCKET}/{key}")
+        # Decode Base64 audio chunk by chunk, transcode and stream into S3
+        greeting_base64 = normalize_b64(greeting_base64)
+        try:
+            stats = write_greeting(
+                S3, AGENT_GREETING_BUCKET, key, iter_b64decode(greeting_base64),
+                total_size=b64_decoded_size(greeting_base64), encoding=encoding
+            )
+        except binascii.Error:
+            logger.warning("[UPLOAD] Rejected greeting: invalid Base64")
+            return respond(400, {"error": "InvalidAudio", "message": "Greeting is not valid Base64."})
+        except WavError as e:
+            logger.warning(f"[UPLOAD] Rejected greeting: {e}")
+            return respond(400, {"error": "InvalidAudio", "message": str(e)})
+        logger.info(f"[UPLOAD SUCCESS] Greeting stored in S3: s3://{AGENT_GREETING_BUCKET}/{key} ({stats['bytes']} bytes)")
 
         # Generate presigned URL for immediate playback
         presigned_url = S3.generate_presigned_url(
@@ -1,6 +1,7 @@
 from utils.aws_clients import connect
 from utils.logger import get_logger
 from utils.http import respond
+from utils.predefined_attributes import invalidate_predefined_attribute_catalog
 from botocore.exceptions import ClientError
 import os
 import json
@@ -69,6 +70,7 @@ def handle_post_predefined_attributes(body: dict):
             Values={"StringList": values}
         )
 
+        invalidate_predefined_attribute_catalog(INSTANCE_ID)
         logger.info(f"[CREATE SUCCESS] Attribute '{name}' created successfully.")
         return respond(201, {
             "created": True,
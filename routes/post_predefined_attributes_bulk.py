@@ -0,0 +1,183 @@
+from utils.aws_clients import connect
+from utils.logger import get_logger
+from utils.http import respond
+from utils.predefined_attributes import (
+    get_predefined_attribute_catalog,
+    invalidate_predefined_attribute_catalog,
+)
+from utils.rate_limit import CONNECT_LIMITER, MAX_SYNC_CONNECT_CALLS
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import os
+import json
+
+# ---------------------------------------------------------------------------
+# Logger and Connect client
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+CONNECT = connect
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+INSTANCE_ID = os.getenv("CONNECT_INSTANCE_ID")
+REGION = os.getenv("CONNECT_REGION", "us-west-2")
+
+MAX_WORKERS = 8
+MAX_ITEMS = MAX_SYNC_CONNECT_CALLS  # writes per request that finish within the API Gateway timeout
+HEADER_NAMES = {"name", "attributename"}
+
+# ---------------------------------------------------------------------------
+# Parsing & validation
+# ---------------------------------------------------------------------------
+def _parse_csv(text):
+    """
+    One row per attribute (or per value): name, value[, value...].
+    Rows with the same name are merged; a leading header row is skipped.
+    """
+    rows = []
+    for i, row in enumerate(csv.reader(io.StringIO(text))):
+        cells = [c.strip() for c in row]
+        if not any(cells):
+            continue
+        if i == 0 and cells[0].lower() in HEADER_NAMES:
+            continue
+        rows.append({"name": cells[0], "values": [c for c in cells[1:] if c]})
+    return rows
+
+
+def _parse_body(body):
+    """Accept a JSON array, {"attributes": [...]}, {"csv": "..."} or raw CSV text."""
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return _parse_csv(body)
+    if isinstance(body, dict):
+        if isinstance(body.get("csv"), str):
+            return _parse_csv(body["csv"])
+        body = body.get("attributes")
+    if not isinstance(body, list):
+        raise ValueError("Body must be a JSON array, {'attributes': [...]}, or CSV text.")
+    return body
+
+
+def _normalize(items):
+    """Validate locally and merge duplicates; returns (valid dict, invalid list)."""
+    merged, invalid = {}, []
+    for idx, it in enumerate(items):
+        if not isinstance(it, dict):
+            invalid.append({"index": idx, "status": "invalid", "message": "Item must be an object."})
+            continue
+        name = it.get("name") or it.get("attributeName")
+        raw_values = it.get("values") if it.get("values") is not None else it.get("StringList")
+
+        if not isinstance(name, str) or not name.strip():
+            invalid.append({"index": idx, "status": "invalid", "message": "Field 'name' is required."})
+            continue
+        if isinstance(raw_values, str):
+            raw_values = [raw_values]
+        if not isinstance(raw_values, list):
+            invalid.append({"index": idx, "name": name, "status": "invalid",
+                            "message": "Field 'values' must be a string or array of strings."})
+            continue
+
+        values = merged.setdefault(name.strip(), [])
+        for v in raw_values:
+            v = str(v).strip()
+            if v and v not in values:
+                values.append(v)
+
+    for name, values in list(merged.items()):
+        if not values:
+            invalid.append({"name": name, "status": "invalid", "message": "Field 'values' cannot be empty."})
+            del merged[name]
+    return merged, invalid
+
+
+# ---------------------------------------------------------------------------
+# Connect writes
+# ---------------------------------------------------------------------------
+def _apply(name, values, exists):
+    fn = CONNECT.update_predefined_attribute if exists else CONNECT.create_predefined_attribute
+    status = "updated" if exists else "created"
+    try:
+        CONNECT_LIMITER.call(fn, InstanceId=INSTANCE_ID, Name=name, Values={"StringList": values})
+        return {"name": name, "status": status, "values": values}
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[BULK FAILED] {name}: [{code}] {msg}")
+        return {"name": name, "status": "failed", "error": code, "message": msg}
+    except Exception as e:
+        logger.exception(f"[BULK EXCEPTION] {name}")
+        return {"name": name, "status": "failed", "error": "InternalServerError", "message": str(e)}
+
+
+# ---------------------------------------------------------------------------
+# Handler
+# ---------------------------------------------------------------------------
+def handle_post_predefined_attributes_bulk(body):
+    """
+    Bulk create/update predefined attributes from CSV or a JSON array.
+    Route: POST /admin-configuration/predefined-attributes/bulk
+    """
+    try:
+        items = _parse_body(body)
+    except ValueError as e:
+        return respond(400, {"error": "BadRequest", "message": str(e)})
+
+    merged, results = _normalize(items)
+    invalid_count = len(results)
+    if not merged and not results:
+        return respond(400, {"error": "BadRequest", "message": "No attributes supplied."})
+
+    try:
+        catalog = get_predefined_attribute_catalog(INSTANCE_ID)
+
+        # ---- Diff against the cached catalog ----
+        pending = []
+        for name, values in merged.items():
+            current = catalog.get(name)
+            if current and current.get("values") == values:
+                results.append({"name": name, "status": "unchanged", "values": values})
+            else:
+                pending.append((name, values, current is not None))
+
+        logger.info(f"[BULK] {len(merged)} attribute(s): {len(pending)} to write, "
+                    f"{len(merged) - len(pending)} unchanged, {invalid_count} invalid")
+
+        # Nothing is written unless every write fits in this request
+        if len(pending) > MAX_ITEMS:
+            return respond(400, {
+                "error": "TooManyItems",
+                "message": f"{len(pending)} attributes need writing; at most {MAX_ITEMS} per request. "
+                           f"Split the import into smaller files.",
+                "maxItems": MAX_ITEMS
+            })
+
+        # ---- Concurrent writes under the Connect rate limiter ----
+        if pending:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                results.extend(executor.map(lambda p: _apply(*p), pending))
+            invalidate_predefined_attribute_catalog(INSTANCE_ID)
+
+        summary = {}
+        for r in results:
+            summary[r["status"]] = summary.get(r["status"], 0) + 1
+
+        return respond(200, {"summary": summary, "results": results})
+
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        msg = err.get("Message", str(e))
+        logger.warning(f"[AWS ERROR] {code}: {msg}")
+        return respond(502, {"error": code, "message": msg})
+
+    except Exception as e:
+        logger.exception("[BULK ERROR] Unhandled exception during bulk attribute import.")
+        return respond(500, {"error": "InternalServerError", "message": str(e)})
@@ -1,8 +1,12 @@
 from utils.logger import get_logger
 from utils.http import respond
+from utils.audio_cache import AudioCache, audio_cache_key, default_audio_store
+from utils.speech_chunks import CONCAT_FORMATS, SSMLSplitError, synthesize_bytes, synthesize_chunked
+from utils.s3_stream import copy_stream
 import boto3
 import base64
 import json
+import os
 from botocore.exceptions import ClientError
 
 # ---------------------------------------------------------------------------
@@ -11,6 +15,69 @@ from botocore.exceptions import ClientError
 logger = get_logger(__name__)
 POLLY = boto3.client("polly")
 
+# Repeat previews of the same text/voice/engine/format skip Polly entirely
+_AUDIO = AudioCache(default_audio_store())
+
+# Long text is split below Polly's per-request limit and synthesized in parallel
+SPEECH_CHUNK_MAX_CHARS = int(os.getenv("SPEECH_CHUNK_MAX_CHARS", "2500"))
+SPEECH_CHUNK_WORKERS = int(os.getenv("SPEECH_CHUNK_WORKERS", "8"))
+
+# delivery=url (or auto for long clips) returns a presigned S3 URL instead of base64
+SPEECH_INLINE_MAX_BYTES = int(os.getenv("SPEECH_INLINE_MAX_BYTES", str(3 * 1024 * 1024)))  # 6 MB response cap after base64
+SPEECH_URL_EXPIRY = int(os.getenv("SPEECH_URL_EXPIRY", "900"))
+DELIVERY_MODES = {"auto", "inline", "url"}
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _synthesize_chunked(synth_params):
+    """Sentence/SSML-aligned chunks synthesized concurrently; (audio_bytes or None, chunk_count)."""
+    return synthesize_chunked(POLLY, synth_params, SPEECH_CHUNK_MAX_CHARS, SPEECH_CHUNK_WORKERS)
+
+def _respond_url(cache_key, output_format, size, cached, chunk_count, meta):
+    return respond(200, {
+        "audioUrl": _AUDIO.store.presigned_url(cache_key, output_format, SPEECH_URL_EXPIRY),
+        "expiresIn": SPEECH_URL_EXPIRY,
+        "bytes": size,
+        **meta,
+        "cached": cached,
+        "chunks": chunk_count
+    })
+
+
+def _respond_by_reference(synth_params, cache_key, chunked, meta):
+    """
+    Deliver audio as a presigned URL to its content-addressed S3 object.
+    Single requests stream Polly's AudioStream straight into S3 (multipart
+    for large clips), so the clip is never fully held in memory or base64'd.
+    """
+    output_format = synth_params["OutputFormat"]
+    if _AUDIO.store.exists(cache_key, output_format):
+        logger.info(f"[CACHE] Audio {cache_key[:12]} already in S3")
+        return _respond_url(cache_key, output_format, None, True, None, meta)
+
+    chunk_count = None
+    if chunked:
+        audio_bytes, chunk_count = _synthesize_chunked(synth_params)
+        size = len(audio_bytes) if audio_bytes is not None else None
+        if audio_bytes is not None:
+            _AUDIO.store.write(cache_key, output_format, audio_bytes)
+    else:
+        audio_stream = POLLY.synthesize_speech(**synth_params).get("AudioStream")
+        size = None
+        if audio_stream:
+            with _AUDIO.store.open_writer(cache_key, output_format) as out:
+                size = copy_stream(audio_stream, out)
+
+    if size is None:
+        logger.error("[ERROR] Polly returned no AudioStream")
+        return respond(502, {
+            "error": "AudioStreamMissing",
+            "message": "No audio data returned by Polly."
+        })
+    logger.info(f"[SUCCESS] Streamed {size} bytes of audio to S3")
+    return _respond_url(cache_key, output_format, size, False, chunk_count, meta)
+
 # ---------------------------------------------------------------------------
 # Handler
 # ---------------------------------------------------------------------------
@@ -25,6 +92,10 @@ def handle_post_speech(body: dict):
     engine = body.get("engine", "neural")
     language_code = body.get("language_code", "en-US")
     text_type = body.get("text_type", "text")
+    # Chunk on request, or automatically when the text exceeds one request's budget
+    chunked = bool(body.get("chunked")) or len(text or "") > SPEECH_CHUNK_MAX_CHARS
+    delivery = body.get("delivery") or "auto"
+    url_capable = hasattr(_AUDIO.store, "presigned_url")
 
     # -------------------- Validation --------------------
     if not text or not voice_id:
@@ -33,39 +104,91 @@ def handle_post_speech(body: dict):
             "error": "BadRequest",
             "message": "Fields 'text' and 'voice' are required."
         })
+    if chunked and output_format not in CONCAT_FORMATS:
+        return respond(400, {
+            "error": "BadRequest",
+            "message": f"Chunked synthesis supports output formats: {', '.join(sorted(CONCAT_FORMATS))}."
+        })
+    if delivery not in DELIVERY_MODES:
+        return respond(400, {
+            "error": "BadRequest",
+            "message": f"'delivery' must be one of: {', '.join(sorted(DELIVERY_MODES))}."
+        })
+    if delivery == "url" and not url_capable:
+        return respond(400, {
+            "error": "BadRequest",
+            "message": "URL delivery requires SPEECH_CACHE_BUCKET to be configured."
+        })
+
+    synth_params = {
+        "Engine": engine,
+        "LanguageCode": language_code,
+        "TextType": text_type,
+        "Text": text,
+        "OutputFormat": output_format,
+        "VoiceId": voice_id
+    }
+    cache_key = audio_cache_key(synth_params)
+    meta = {
+        "voice": voice_id,
+        "format": output_format,
+        "engine": engine,
+        "language_code": language_code,
+        "cacheKey": cache_key
+    }
 
     try:
+        # -------------------- By-reference Delivery --------------------
+        # Long (chunked) text defaults to a URL when a bucket is configured
+        if delivery == "url" or (delivery == "auto" and chunked and url_capable):
+            return _respond_by_reference(synth_params, cache_key, chunked, meta)
+
+        # -------------------- Audio Cache --------------------
+        audio_bytes = _AUDIO.get(cache_key, output_format)
+        cached = audio_bytes is not None
+
         # -------------------- Polly Synthesis --------------------
-        logger.info(f"[POLLY] Synthesizing with Voice={voice_id}, Engine={engine}, Lang={language_code}")
-        response = POLLY.synthesize_speech(
-            Engine=engine,
-            LanguageCode=language_code,
-            TextType=text_type,
-            Text=text,
-            OutputFormat=output_format,
-            VoiceId=voice_id
-        )
-
-        audio_stream = response.get("AudioStream")
-        if not audio_stream:
-            logger.error("[ERROR] Polly returned no AudioStream")
-            return respond(502, {
-                "error": "AudioStreamMissing",
-                "message": "No audio data returned by Polly."
-            })
+        chunk_count = None
+        if cached:
+            logger.info(f"[CACHE] Audio {cache_key[:12]} served without Polly")
+        else:
+            logger.info(f"[POLLY] Synthesizing with Voice={voice_id}, Engine={engine}, Lang={language_code}")
+            if chunked:
+                audio_bytes, chunk_count = _synthesize_chunked(synth_params)
+            else:
+                audio_bytes = synthesize_bytes(POLLY, synth_params)
+
+            if audio_bytes is None:
+                logger.error("[ERROR] Polly returned no AudioStream")
+                return respond(502, {
+                    "error": "AudioStreamMissing",
+                    "message": "No audio data returned by Polly."
+                })
+
+            audio_bytes = _AUDIO.put(cache_key, output_format, audio_bytes)
+            logger.info(f"[SUCCESS] Synthesized {len(audio_bytes)} bytes of audio")
+
+        # Too large for an inline response: the cache already holds it in S3
+        if delivery == "auto" and url_capable and len(audio_bytes) > SPEECH_INLINE_MAX_BYTES:
+            return _respond_url(cache_key, output_format, len(audio_bytes), cached, chunk_count, meta)
 
         # Convert audio to base64 for client use
-        audio_bytes = audio_stream.read()
         audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
 
-        logger.info(f"[SUCCESS] Synthesized {len(audio_bytes)} bytes of audio")
-
         return respond(200, {
             "audio": audio_base64,
-            "voice": voice_id,
-            "format": output_format,
-            "engine": engine,
-            "language_code": language_code
+            **meta,
+            "cached": cached,
+            "chunks": chunk_count
+        })
+
+    # -------------------- Unsplittable SSML --------------------
+    # Raised while chunking, before any Polly call
+    except SSMLSplitError as e:
+        logger.warning(f"[VALIDATION] {e}")
+        return respond(400, {
+            "error": "BadRequest",
+            "message": f"{e}; break it into shorter elements or sentences."
         })
 
     # -------------------- AWS Error Handling --------------------
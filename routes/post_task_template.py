@@ -1,9 +1,18 @@
 from utils.aws_clients import ddb as DDB, connect as CONNECT, table
 from utils.logger import get_logger
 from utils.http import respond, cors_headers
+from utils.rate_limit import CONNECT_LIMITER, MAX_SYNC_CONNECT_CALLS
+from utils.task_mapping import SchemaError, get_task_mapper
+from utils.connect_names import resolve_contact_flow_id, resolve_quick_connect_id
+from utils.work_queue import DONE, FAILED, QUEUED, RETRYABLE_ERRORS, WorkQueueUnavailable, get_work_queue
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 import os
 import logging
+import time
+import uuid
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -15,8 +24,23 @@ logger.setLevel(logging.INFO)
 # ---- ENV CONFIG ----
 INSTANCE_ID       = os.environ.get("CONNECT_INSTANCE_ID")
 REGION            = os.environ.get("CONNECT_REGION", "us-west-2")
-QUICK_CONNECT_ID  = os.environ.get("QUICK_CONNECT_ID", "b96ec20b-10fe-4521-9a8b-e329f65e0706")  # change as needed
+QUICK_CONNECT_ID  = os.environ.get("QUICK_CONNECT_ID", "b96ec20b-10fe-4521-9a8b-e329f65e0706")  # id or name; used when a template opts in
 LOCAL_TZ          = os.environ.get("LOCAL_TZ", "America/Toronto")  # interpret incoming date/time in this tz
+CONTACT_FLOW_ID   = os.environ.get("TASK_CONTACT_FLOW_ID", "5be486e1-bf19-4094-a5b7-e3da975bdd61")  # id or name
+
+BULK_MAX_ROWS     = 200
+# Synchronous bulk must finish inside the API Gateway timeout at the Connect rate limit
+SYNC_MAX_ROWS     = min(BULK_MAX_ROWS, MAX_SYNC_CONNECT_CALLS)
+BULK_MAX_WORKERS  = 8
+# Namespace for deterministic ClientTokens (uuid5) of bulk rows
+CLIENT_TOKEN_NS   = uuid.UUID("6f1c8f8e-3c1a-4d8e-9b51-2f0a6c7d4e10")
+
+# Async submission (mode=async): tickets drained by a scheduled invocation
+TASK_QUEUE              = "tasks"
+TASK_QUEUE_DRAIN_BATCH  = int(os.environ.get("TASK_QUEUE_DRAIN_BATCH", "10"))   # tickets per drain
+TASK_QUEUE_MAX_ATTEMPTS = int(os.environ.get("TASK_QUEUE_MAX_ATTEMPTS", "5"))
+TASK_QUEUE_TIME_BUDGET  = int(os.environ.get("TASK_QUEUE_TIME_BUDGET", "300"))  # seconds per drain
+LEASE_MARGIN            = 60  # lease outlives the drain's deadline by this much
 
 connect = CONNECT
 
@@ -32,37 +56,22 @@ def _resp(status, payload):
         "body": json.dumps(payload)
     }
 
-def _field_value(fields, *candidates):
-    
-    name_map  = {str(f.get("name", "")).strip().lower(): f.get("value") for f in fields}
-    label_map = {str(f.get("label", "")).strip().lower(): f.get("value") for f in fields}
-    for cand in candidates:
-        key = str(cand).strip().lower()
-        if key in name_map and name_map[key] is not None:
-            return name_map[key]
-        if key in label_map and label_map[key] is not None:
-            return label_map[key]
-    return None
-
-def _build_scheduled_time(fields):
+def _build_scheduled_time(date_str, time_str):
     """
     Combine date (YYYY-MM-DD) and time (HH:MM) from fields into epoch seconds.
     Returns an int epoch or None if inputs are missing/invalid.
     """
-    date_str = _field_value(fields, "scheduleDateTime", "schedule date/time", "date")
-    time_str = _field_value(fields, "scheduleTime", "schedule time", "time")
-
     if not date_str or not time_str:
         return None
 
     try:
         tz = ZoneInfo(LOCAL_TZ)
         # Accept "HH:MM" or "HH:MM:SS"
-        parts = [int(x) for x in time_str.split(":")]
+        parts = [int(x) for x in str(time_str).split(":")]
         hour, minute = parts[0], parts[1]
         second = parts[2] if len(parts) > 2 else 0
 
-        dt_local = datetime.strptime(date_str, "%Y-%m-%d").replace(
+        dt_local = datetime.strptime(str(date_str), "%Y-%m-%d").replace(
             hour=hour, minute=minute, second=second, tzinfo=tz
         )
         return int(dt_local.timestamp())
@@ -70,113 +79,322 @@ def _build_scheduled_time(fields):
         logger.exception("Failed to parse schedule date/time: %s", e)
         return None
 
-def _build_attributes(fields):
+def _resolve_routing(mapper):
+    """
+    Contact flow / quick connect ids for a template. Names resolve through a
+    cached list_contact_flows / list_quick_connects index (no per-request calls).
+    A schema's quickConnect of true means "use QUICK_CONNECT_ID".
+    """
+    quick_connect = mapper.quick_connect
+    if quick_connect is True:
+        quick_connect = QUICK_CONNECT_ID
+    return (
+        resolve_contact_flow_id(mapper.contact_flow or CONTACT_FLOW_ID, INSTANCE_ID),
+        resolve_quick_connect_id(quick_connect, INSTANCE_ID) if quick_connect else None,
+    )
+
+def _build_start_kwargs(body, fields, mapper, routing):
     """
-    Put business attributes (string-only) here.
+    Map one set of form fields to start_task_contact kwargs using the
+    template's compiled mapping schema. Returns (kwargs, scheduled_epoch, errors).
     """
-    attrs = {}
-    # Examples based on your body
-    acct = _field_value(fields, "Account_Number", "Account Number")
-    if acct is not None:
-        attrs["Account_Number"] = str(acct)
+    contact_flow_id, quick_connect_id = routing
+    mapped, errors = mapper.map(body, fields)
+    scheduled_epoch = _build_scheduled_time(mapped["scheduleDate"], mapped["scheduleTime"])
+
+    start_kwargs = {
+        "InstanceId": INSTANCE_ID,
+        "Name": str(mapped["name"]),        # <-- Name should be taskName (from your form)
+        "Description": str(mapped["description"]),
+        "Attributes": mapped["Attributes"],
+        "References": mapped["References"],
+        "ContactFlowId": contact_flow_id
+    }
+
+    # Quick Connect routing and ScheduledTime are opt-in per template schema
+    if quick_connect_id:
+        start_kwargs["QuickConnectId"] = quick_connect_id
+    if mapper.include_scheduled_time and scheduled_epoch is not None:
+        # Boto3 accepts int epoch; you can also pass a datetime
+        start_kwargs["ScheduledTime"] = scheduled_epoch
 
-    meter = _field_value(fields, "Meter_Number", "Meter Number")
-    if meter is not None:
-        attrs["Meter_Number"] = str(meter)
+    return start_kwargs, scheduled_epoch, errors
 
-    customer_type = _field_value(fields, "Customer_Type", "Customer Type")
-    if customer_type:
-        attrs["Customer_Type"] = str(customer_type)
 
-    service_type = _field_value(fields, "Service_Type", "Service Type")
-    if service_type:
-        attrs["Service_Type"] = str(service_type)
+def _content_digest(start_kwargs):
+    return hashlib.sha256(json.dumps(start_kwargs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
 
-    return attrs
 
-def _build_references(body, fields, scheduled_epoch):
+def _row_key(row, start_kwargs, seen):
     """
-    Convert misc fields to References with correct Type.
-    Allowed types: STRING | NUMBER | EMAIL | URL | DATE
+    Identity of a row within its batch: the caller's 'rowId', else the
+    content digest plus its occurrence number (identical rows stay distinct).
+    Independent of position, so a retry that reorders or drops rows keeps
+    the other rows' tokens. Returns None for a repeated rowId.
     """
-    refs = {}
-
-    # From fields
-    email = _field_value(fields, "Sample_Email", "Sample Email")
-    if email:
-        refs["Sample_Email"] = {"Value": str(email), "Type": "EMAIL"}
-
-    # Booleans -> STRING "true"/"false"
-    self_assign = _field_value(fields, "selfAssign", "Self Assign")
-    if self_assign is not None:
-        refs["Self_Assign"] = {"Value": str(bool(self_assign)).lower(), "Type": "STRING"}
-
-    # Optional: surface checkbox as STRING
-    sample_checkbox = _field_value(fields, "Sample_Checkbox", "Sample Checkbox")
-    if sample_checkbox is not None:
-        refs["Sample_Checkbox"] = {"Value": str(bool(sample_checkbox)).lower(), "Type": "STRING"}
-
-    # Optional: include the scheduled time also as a DATE-type reference for visibility
-    '''
-    if scheduled_epoch is not None:
-        refs["Scheduled_For"] = {"Value": str(scheduled_epoch), "Type": "DATE"}
-    '''
-
-    # Helpful trace refs from the top-level request (STRINGs)
-    if body.get("agentName"):
-        refs["Agent_Name"] = {"Value": body["agentName"], "Type": "STRING"}
-    if body.get("agentRoutingProfile"):
-        refs["Agent_Routing_Profile"] = {"Value": body["agentRoutingProfile"], "Type": "STRING"}
-    if body.get("agentARN"):
-        refs["Agent_ARN"] = {"Value": body["agentARN"], "Type": "STRING"}
-    if body.get("agentRoutingProfileARN"):
-        refs["RoutingProfile_ARN"] = {"Value": body["agentRoutingProfileARN"], "Type": "STRING"}
-
-    return refs
+    row_id = row.get("rowId") if isinstance(row, dict) else None
+    key = f"id:{row_id}" if row_id not in (None, "") else f"sha:{_content_digest(start_kwargs)}"
+    seen[key] = seen.get(key, 0) + 1
+    if row_id not in (None, ""):
+        return key if seen[key] == 1 else None
+    return f"{key}:{seen[key]}"
 
-def handle_post_task_template_app(body):
+
+def _client_token(batch_id, row_key):
+    """Deterministic idempotency token: same batch and row -> same token."""
+    return str(uuid.uuid5(CLIENT_TOKEN_NS, f"{batch_id}:{row_key}"))
+
+
+def _start_task(index, start_kwargs, scheduled_epoch):
     try:
-        logger.info("Incoming body: %s", body)
+        resp = CONNECT_LIMITER.call(connect.start_task_contact, **start_kwargs)
+        return {
+            "index": index,
+            "contactId": resp.get("ContactId"),
+            "taskArn": resp.get("ContactArn"),
+            "scheduledTime": scheduled_epoch,
+            "clientToken": start_kwargs["ClientToken"],
+        }
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        logger.warning("Bulk row %s failed: [%s] %s", index, code, err.get("Message"))
+        return {"index": index, "error": code, "message": err.get("Message", str(e)),
+                "retryable": code in RETRYABLE_ERRORS}
+    except Exception as e:
+        logger.exception("Bulk row %s failed", index)
+        return {"index": index, "error": "InternalServerError", "message": str(e), "retryable": True}
 
-        fields = body.get("fields", [])
+
+def _handle_bulk(body):
+    """
+    Create one task per row concurrently. Each row is either a list of fields
+    or an object with a 'fields' list and an optional 'rowId'. The caller
+    must supply a 'batchId' (a fresh one per logical batch) and resend it on
+    retry: Connect de-duplicates on ClientToken for about 7 days, so a retry
+    after a timeout cannot create duplicates. Larger batches go through
+    mode=async.
+    """
+    rows = body.get("rows")
+    batch_id = body.get("batchId")
+    if not isinstance(rows, list) or not rows:
+        return _resp(400, {"error": "Field 'rows' must be a non-empty array."})
+    if not isinstance(batch_id, str) or not batch_id.strip():
+        return _resp(400, {"error": "Field 'batchId' is required for bulk requests; "
+                                    "generate one per batch and resend it on retry."})
+    if len(rows) > SYNC_MAX_ROWS:
+        return _resp(400, {"error": f"At most {SYNC_MAX_ROWS} rows per synchronous request; "
+                                    f"use \"mode\": \"async\" for up to {BULK_MAX_ROWS}."})
+
+    mapper = get_task_mapper(body.get("templateId"))
+    try:
+        routing = _resolve_routing(mapper)
+    except LookupError as e:
+        return _resp(400, {"error": str(e)})
+    jobs, results, seen = [], [], {}
+    for index, row in enumerate(rows):
+        fields = row.get("fields") if isinstance(row, dict) else row
         if not isinstance(fields, list):
-            fields = []
+            results.append({"index": index, "error": "BadRequest", "message": "Row must be a list of fields."})
+            continue
+        start_kwargs, scheduled_epoch, errors = _build_start_kwargs(body, fields, mapper, routing)
+        if errors:
+            results.append({"index": index, "error": "ValidationError", "message": "; ".join(errors)})
+            continue
+        row_key = _row_key(row, start_kwargs, seen)
+        if row_key is None:
+            results.append({"index": index, "error": "BadRequest", "message": "Duplicate 'rowId' in batch."})
+            continue
+        start_kwargs["ClientToken"] = _client_token(batch_id, row_key)
+        jobs.append((index, start_kwargs, scheduled_epoch))
+
+    with ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS) as executor:
+        results.extend(executor.map(lambda j: _start_task(*j), jobs))
+    results.sort(key=lambda r: r["index"])
+
+    created = sum(1 for r in results if r.get("contactId"))
+    logger.info("Bulk task creation: %s/%s created (batchId=%s)", created, len(rows), batch_id)
+    return _resp(200, {
+        "message": f"{created} of {len(rows)} task(s) created.",
+        "batchId": batch_id,
+        "created": created,
+        "failed": len(rows) - created,
+        "results": results
+    })
+
+
+def _handle_async(body):
+    """
+    Validate every row up front, enqueue the prepared start_task_contact kwargs
+    and return a ticket id immediately (202). Nothing is queued if any row is
+    invalid, so a ticket only ever fails on Connect errors.
+    """
+    rows = body.get("rows")
+    if rows is None:
+        rows = [body.get("fields", [])]
+    if not isinstance(rows, list) or not rows:
+        return _resp(400, {"error": "Field 'rows' must be a non-empty array."})
+    if len(rows) > BULK_MAX_ROWS:
+        return _resp(400, {"error": f"At most {BULK_MAX_ROWS} rows per request."})
+
+    mapper = get_task_mapper(body.get("templateId"))
+    try:
+        routing = _resolve_routing(mapper)
+    except LookupError as e:
+        return _resp(400, {"error": str(e)})
 
-        # Task Name (explicitly requested): prefer name 'taskName' or label 'Task Name', else fall back to 'T'
-        task_name = _field_value(fields, "taskName", "Task Name", "T")
-        if not task_name:
-            task_name = "Task"  # minimal fallback
+    tasks, invalid, seen = [], [], {}
+    for index, row in enumerate(rows):
+        fields = row.get("fields") if isinstance(row, dict) else row
+        if not isinstance(fields, list):
+            invalid.append({"index": index, "error": "BadRequest", "message": "Row must be a list of fields."})
+            continue
+        start_kwargs, scheduled_epoch, errors = _build_start_kwargs(body, fields, mapper, routing)
+        if errors:
+            invalid.append({"index": index, "error": "ValidationError", "message": "; ".join(errors)})
+            continue
+        row_key = _row_key(row, start_kwargs, seen)
+        if row_key is None:
+            invalid.append({"index": index, "error": "BadRequest", "message": "Duplicate 'rowId' in batch."})
+            continue
+        tasks.append({"kwargs": start_kwargs, "scheduledTime": scheduled_epoch, "rowKey": row_key})
+    if invalid:
+        return _resp(400, {"error": "ValidationError", "results": invalid})
+
+    batch_id = body.get("batchId") or uuid.uuid4().hex
+    try:
+        queue = get_work_queue()
+    except WorkQueueUnavailable as e:
+        return _resp(503, {"error": str(e)})
+    ticket_id = queue.enqueue(TASK_QUEUE, {"batchId": batch_id, "tasks": tasks})
+    logger.info("Queued %s task(s) under ticket %s", len(tasks), ticket_id)
+    return _resp(202, {"message": f"{len(tasks)} task(s) queued.", "ticketId": ticket_id,
+                       "batchId": batch_id, "status": QUEUED})
+
+
+def _handle_status(body):
+    ticket_id = body.get("ticketId")
+    if not ticket_id:
+        return _resp(400, {"error": "Field 'ticketId' is required."})
+    try:
+        ticket = get_work_queue().get(ticket_id)
+    except WorkQueueUnavailable as e:
+        return _resp(503, {"error": str(e)})
+    if not ticket:
+        return _resp(404, {"error": f"Ticket '{ticket_id}' not found."})
+    return _resp(200, ticket)
 
-        # Description
-        description = _field_value(fields, "description", "Description") or ""
 
-        # ScheduledTime (epoch seconds)
-        scheduled_epoch = _build_scheduled_time(fields)
+def drain_task_queue(max_tickets=TASK_QUEUE_DRAIN_BATCH, deadline=None):
+    """
+    Submit queued tickets (scheduled invocation) until `deadline` (epoch
+    seconds; never later than TASK_QUEUE_TIME_BUDGET from now). Claims are leased past
+    the deadline, so a ticket is never re-claimed while this drain still works
+    on it; rows not started in time stay queued for the next drain, and the
+    ticket is only settled once every row has been attempted. Rows already
+    created (or failed for good) on an earlier attempt are skipped; retryable
+    failures put the ticket back on the queue with exponential backoff until
+    TASK_QUEUE_MAX_ATTEMPTS retry rounds.
+    ClientTokens derive from the batch id and row key, so a re-run after a
+    crash (or a resubmitted batch) cannot create duplicates.
+    """
+    try:
+        queue = get_work_queue()
+    except WorkQueueUnavailable as e:
+        logger.warning("Task drain skipped: %s", e)
+        return {"tickets": 0, "skipped": str(e)}
+    now = time.time()
+    deadline = min(deadline or now + TASK_QUEUE_TIME_BUDGET, now + TASK_QUEUE_TIME_BUDGET)
+    tickets = queue.claim(TASK_QUEUE, max_tickets, lease=deadline - now + LEASE_MARGIN)
+    if not tickets:
+        return {"tickets": 0}
+
+    jobs = []
+    for ticket in tickets:
+        previous = ticket["result"] or {}
+        ticket["retries"] = previous.get("retries", 0)
+        # Created rows and non-retryable failures are final; everything else is (re)submitted
+        done = {r["index"]: r for r in previous.get("results", [])
+                if r.get("contactId") or not r.get("retryable")}
+        ticket["results"] = done
+        for index, task in enumerate(ticket["payload"]["tasks"]):
+            if index in done:
+                continue
+            start_kwargs = dict(task["kwargs"])
+            if task.get("rowKey"):
+                token = _client_token(ticket["payload"].get("batchId") or ticket["ticketId"], task["rowKey"])
+            else:
+                # Tickets queued before row keys: keep the token earlier attempts used
+                token = _client_token(ticket["ticketId"], f"{index}:{_content_digest(start_kwargs)}")
+            start_kwargs["ClientToken"] = token
+            jobs.append((ticket, index, start_kwargs, task.get("scheduledTime")))
+
+    def run(job):
+        # Rows reached after the deadline are left for the next drain
+        return job[0], _start_task(*job[1:]) if time.time() < deadline else None
+
+    with ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS) as executor:
+        outcomes = list(executor.map(run, jobs))
+    for ticket, result in outcomes:
+        if result is None:
+            ticket["deferred"] = ticket.get("deferred", 0) + 1
+        else:
+            ticket["results"][result["index"]] = result
+
+    summary = {"tickets": len(tickets), DONE: 0, FAILED: 0, QUEUED: 0}
+    for ticket in tickets:
+        results = [ticket["results"][i] for i in sorted(ticket["results"])]
+        created = sum(1 for r in results if r.get("contactId"))
+        failures = [r for r in results if not r.get("contactId")]
+        retries = ticket["retries"]
+        if ticket.get("deferred"):
+            # Out of time: finish the remaining rows on the next drain before settling
+            status, next_attempt = QUEUED, None
+        elif not failures:
+            status, next_attempt = DONE, None
+        elif any(r.get("retryable") for r in failures) and retries < TASK_QUEUE_MAX_ATTEMPTS:
+            # Only the retryable rows are resubmitted; permanent failures are kept as-is
+            retries += 1
+            status, next_attempt = QUEUED, time.time() + min(2 ** retries * 15, 900)
+        else:
+            status, next_attempt = FAILED, None
+        queue.update(TASK_QUEUE, ticket["ticketId"], status, {
+            "created": created,
+            "failed": len(failures),
+            "deferred": ticket.get("deferred", 0),
+            "retries": retries,
+            "results": results,
+        }, next_attempt)
+        summary[status] += 1
+        logger.info("Ticket %s: %s/%s created -> %s (attempt %s)",
+                    ticket["ticketId"], created, len(results), status, ticket["attempts"])
+    return summary
 
-        attributes = _build_attributes(fields)
-        references = _build_references(body, fields, scheduled_epoch)
 
-        start_kwargs = {
-            "InstanceId": INSTANCE_ID,
-            "Name": task_name,                 # <-- Name should be taskName (from your form)
-            "Description": description,
-            "Attributes": attributes,
-            "References": references,
-            "ContactFlowId": "5be486e1-bf19-4094-a5b7-e3da975bdd61"
-        }
+def handle_post_task_template_app(body):
+    try:
+        logger.info("Incoming body: %s", body)
 
-        # Use Quick Connect for routing (recommended)
-        '''
-        if QUICK_CONNECT_ID:
-            start_kwargs["QuickConnectId"] = QUICK_CONNECT_ID
-        '''
+        if body.get("action") == "status":
+            return _handle_status(body)
+        if body.get("mode") == "async":
+            return _handle_async(body)
+        if isinstance(body.get("rows"), list) or body.get("mode") == "bulk":
+            return _handle_bulk(body)
 
-        # Only include ScheduledTime if provided
-        '''
-        if scheduled_epoch is not None:
-            # Boto3 accepts int epoch; you can also pass a datetime
-            start_kwargs["ScheduledTime"] = scheduled_epoch
-        '''
+        fields = body.get("fields", [])
+        if not isinstance(fields, list):
+            fields = []
+
+        mapper = get_task_mapper(body.get("templateId"))
+        try:
+            routing = _resolve_routing(mapper)
+        except LookupError as e:
+            return _resp(400, {"error": str(e)})
+        start_kwargs, scheduled_epoch, errors = _build_start_kwargs(body, fields, mapper, routing)
+        if errors:
+            return _resp(400, {"error": "ValidationError", "details": errors})
+        references = start_kwargs["References"]
 
         logger.info("start_task_contact kwargs (redacted where needed): %s", {**start_kwargs, "References": f"{len(references)} refs"})
 
@@ -190,6 +408,10 @@ def handle_post_task_template_app(body):
             "scheduledTime": scheduled_epoch
         })
 
+    except SchemaError as e:
+        logger.error("Invalid task mapping schema: %s", e)
+        return _resp(500, {"error": f"Invalid task mapping schema: {e}"})
+
     except Exception as e:
         logger.exception("Error creating task")
         return _resp(500, {"error": str(e)})
@@ -0,0 +1,31 @@
+"""
+One-time backfill of the routing-profile -> email template index.
+
+Usage:
+    DDB_TABLE_TECO_EMAIL_TEMPLATE_PROFILE_INDEX=teco_email_template_profile_index \
+        python scripts/backfill_email_template_index.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.email_templates import PROFILE_INDEX_TABLE_NAME, backfill_template_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Count rows without writing")
+    args = parser.parse_args()
+
+    if not PROFILE_INDEX_TABLE_NAME:
+        sys.exit("DDB_TABLE_TECO_EMAIL_TEMPLATE_PROFILE_INDEX is not set")
+
+    stats = backfill_template_index(dry_run=args.dry_run)
+    verb = "Would write" if args.dry_run else "Wrote"
+    print(f"{verb} {stats['rows']} index row(s) for {stats['templates']} template(s) into {PROFILE_INDEX_TABLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark read capacity and latency of email templates, plain vs compressed bodies.
+
+Measures the read units DynamoDB reports (ConsumedCapacity) for a paginated
+scan and for a GetItem of every template in the table's current layout, and
+times decompression of the bodies. Run it before and after the compression
+backfill to compare real numbers:
+
+    python scripts/bench_email_template_compression.py --save before.json
+    python scripts/compress_email_template_bodies.py
+    python scripts/bench_email_template_compression.py --compare before.json
+
+Usage:
+    python scripts/bench_email_template_compression.py [--threshold 4096] [--rounds 3]
+        [--save FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.email_templates import (
+    BODY_COMPRESS_THRESHOLD,
+    BODY_FIELD,
+    COMPRESSED_BODY_FIELD,
+    EMAIL_TEMPLATES_TABLE,
+    TEMPLATE_KEY,
+    compress_body,
+)
+
+
+def _consumed(result):
+    return result.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+
+
+def _timed_scan():
+    start, rcu, items, kwargs = time.perf_counter(), 0.0, [], {"ReturnConsumedCapacity": "TOTAL"}
+    while True:
+        result = EMAIL_TEMPLATES_TABLE.scan(**kwargs)
+        rcu += _consumed(result)
+        items.extend(result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            return items, rcu, time.perf_counter() - start
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+def _timed_gets(template_ids):
+    """GetItem every template; returns (measured RCU, wall time)."""
+    start, rcu = time.perf_counter(), 0.0
+    for template_id in template_ids:
+        result = EMAIL_TEMPLATES_TABLE.get_item(Key={TEMPLATE_KEY: template_id}, ReturnConsumedCapacity="TOTAL")
+        rcu += _consumed(result)
+    return rcu, time.perf_counter() - start
+
+
+def _stored_size(item):
+    value = item.get(COMPRESSED_BODY_FIELD, item.get(BODY_FIELD))
+    value = getattr(value, "value", value)
+    return len(value.encode("utf-8") if isinstance(value, str) else value or b"")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threshold", type=int, default=BODY_COMPRESS_THRESHOLD)
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions to average")
+    parser.add_argument("--save", help="Write the measurements to this JSON file")
+    parser.add_argument("--compare", help="Print these measurements (from --save) next to the current ones")
+    args = parser.parse_args()
+
+    rounds = max(1, args.rounds)
+    scans = [_timed_scan() for _ in range(rounds)]
+    items = scans[-1][0]
+    template_ids = [i[TEMPLATE_KEY] for i in items if TEMPLATE_KEY in i]
+    gets = [_timed_gets(template_ids) for _ in range(rounds)]
+
+    # Decompression cost: stored compressed bodies, or what the backfill would produce
+    blobs = [bytes(getattr(i[COMPRESSED_BODY_FIELD], "value", i[COMPRESSED_BODY_FIELD]))
+             for i in items if COMPRESSED_BODY_FIELD in i]
+    source = "stored"
+    if not blobs:
+        source = "local"
+        blobs = [p[COMPRESSED_BODY_FIELD] for p in (compress_body(i, args.threshold) for i in items)
+                 if COMPRESSED_BODY_FIELD in p]
+    start = time.perf_counter()
+    for blob in blobs:
+        zlib.decompress(blob)
+    decompress_ms = (time.perf_counter() - start) * 1000
+
+    current = {
+        "templates": len(items),
+        "compressedBodies": sum(1 for i in items if COMPRESSED_BODY_FIELD in i),
+        "bodyBytes": sum(_stored_size(i) for i in items),
+        "scanRcu": sum(s[1] for s in scans) / rounds,
+        "scanMs": sum(s[2] for s in scans) / rounds * 1000,
+        "getItemRcu": sum(g[0] for g in gets) / rounds,
+        "getItemMs": sum(g[1] for g in gets) / rounds * 1000,
+    }
+
+    print(f"Templates:              {current['templates']} ({current['compressedBodies']} compressed)")
+    print(f"Stored body bytes:      {current['bodyBytes']}")
+    print(f"Scan (measured):        {current['scanRcu']:.1f} RCU, {current['scanMs']:.1f} ms avg over {rounds} run(s)")
+    print(f"GetItem all (measured): {current['getItemRcu']:.1f} RCU, {current['getItemMs']:.1f} ms avg over {rounds} run(s)")
+    print(f"Decompress {len(blobs)} {source} bodies: {decompress_ms:.2f} ms "
+          f"({decompress_ms / max(len(blobs), 1):.3f} ms/body)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)
+        print(f"\n{'':16}{'before':>12}{'after':>12}")
+        for key in ("bodyBytes", "scanRcu", "getItemRcu", "scanMs", "getItemMs"):
+            print(f"{key:16}{before.get(key, 0):>12.1f}{current[key]:>12.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved measurements to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
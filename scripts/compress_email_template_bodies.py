@@ -0,0 +1,33 @@
+"""
+Backfill: store large email template bodies zlib-compressed as Binary attributes.
+
+Usage:
+    python scripts/compress_email_template_bodies.py [--threshold 4096] [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.email_templates import BODY_COMPRESS_THRESHOLD, backfill_compressed_bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threshold", type=int, default=BODY_COMPRESS_THRESHOLD,
+                        help="Compress bodies of at least this many bytes")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without writing")
+    args = parser.parse_args()
+
+    stats = backfill_compressed_bodies(threshold=args.threshold, dry_run=args.dry_run)
+    verb = "Would compress" if args.dry_run else "Compressed"
+    saved = stats["bytesBefore"] - stats["bytesAfter"]
+    print(f"{verb} {stats['compressed']} of {stats['templates']} template bodies: "
+          f"{stats['bytesBefore']} -> {stats['bytesAfter']} bytes ({saved} saved)")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} template(s) edited during the run; re-run to pick them up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+One-time migration: add the channel_type attribute to existing channel configs.
+
+Run this before setting DDB_INDEX_CONFIGS_CHANNEL_TYPE, after creating the GSI
+(partition key business_group_id, sort key channel_type, projection ALL).
+
+Usage:
+    DDB_TABLE_TECO_DYNAMODB_BUSINESS_GROUP_CONFIGS_US_EAST_1_DEV=teco-dynamodb-business-group-configs-us-east-1-dev \
+        python scripts/migrate_config_channel_type.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.post_chaneltype_configs import CONFIGS_TABLE_NAME, backfill_channel_types
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Count items without writing")
+    args = parser.parse_args()
+
+    stats = backfill_channel_types(dry_run=args.dry_run)
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {stats['updated']} of {stats['items']} item(s) in {CONFIGS_TABLE_NAME} ({stats['skipped']} already set, without a channel or deleted during the run)")
+
+
+if __name__ == "__main__":
+    main()
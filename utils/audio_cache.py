@@ -0,0 +1,189 @@
+from utils.logger import get_logger
+from utils.cache import evict_directory
+from utils.s3_stream import MultipartWriter
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+import boto3
+import hashlib
+import json
+import os
+import threading
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+SPEECH_CACHE_BUCKET = os.getenv("SPEECH_CACHE_BUCKET")  # durable tier; unset -> SPEECH_CACHE_DIR
+SPEECH_CACHE_PREFIX = os.getenv("SPEECH_CACHE_PREFIX", "polly-cache/")
+SPEECH_CACHE_DIR = os.getenv("SPEECH_CACHE_DIR", "/tmp/polly-cache")
+SPEECH_CACHE_DIR_MAX_BYTES = int(os.getenv("SPEECH_CACHE_DIR_MAX_BYTES", str(128 * 1024 * 1024)))  # default 128 MB
+SPEECH_CACHE_MEMORY_BYTES = int(os.getenv("SPEECH_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))  # default 32 MB
+
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "ogg_vorbis": "audio/ogg",
+    "pcm": "audio/pcm",
+    "json": "application/x-json-stream",
+}
+
+
+def audio_cache_key(params: dict) -> str:
+    """Content address for a synthesis request: sha256 of its canonical JSON."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Tiers
+# ---------------------------------------------------------------------------
+class ByteLRU:
+    """In-process LRU bounded by the total size of its values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class S3AudioStore:
+    """Objects at s3://bucket/{prefix}{key}.{ext}; shared by every container."""
+
+    def __init__(self, bucket, prefix=SPEECH_CACHE_PREFIX, client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or boto3.client("s3")
+
+    def object_key(self, key, fmt):
+        return f"{self.prefix}{key}.{fmt}"
+
+    def read(self, key, fmt):
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key, fmt))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return obj["Body"].read()
+
+    def write(self, key, fmt, data):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.object_key(key, fmt),
+            Body=data,
+            ContentType=CONTENT_TYPES.get(fmt, "application/octet-stream"),
+        )
+
+    def exists(self, key, fmt):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key, fmt))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound"):
+                return False
+            raise
+
+    def open_writer(self, key, fmt):
+        """Streaming writer for audio that should not be held in memory."""
+        return MultipartWriter(
+            self.client, self.bucket, self.object_key(key, fmt), CONTENT_TYPES.get(fmt, "application/octet-stream")
+        )
+
+    def presigned_url(self, key, fmt, expires_in):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.object_key(key, fmt)},
+            ExpiresIn=expires_in,
+        )
+
+
+class DirAudioStore:
+    """Local directory stand-in for S3 (tests, local runs), bounded like FileStore."""
+
+    def __init__(self, directory=SPEECH_CACHE_DIR, max_bytes=SPEECH_CACHE_DIR_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def read(self, key, fmt):
+        try:
+            with open(self._path(key, fmt), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, fmt, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key, fmt)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        evict_directory(self.directory, self.max_bytes)
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+class AudioCache:
+    """
+    Content-addressed audio: memory LRU in front of a durable store. Entries
+    never go stale (the key is the content), so there is no TTL.
+    """
+
+    def __init__(self, store, memory_max_bytes=SPEECH_CACHE_MEMORY_BYTES):
+        self.store = store
+        self.memory = ByteLRU(memory_max_bytes)
+
+    def get(self, key, fmt):
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+        try:
+            data = self.store.read(key, fmt)
+        except Exception as e:
+            logger.warning(f"[AUDIO CACHE] Store read failed for {key}: {e}")
+            return None
+        if data is not None:
+            self.memory.put(key, data)
+        return data
+
+    def put(self, key, fmt, data):
+        self.memory.put(key, data)
+        try:
+            self.store.write(key, fmt, data)
+        except Exception as e:
+            logger.warning(f"[AUDIO CACHE] Store write failed for {key}: {e}")
+        return data
+
+
+def default_audio_store():
+    if SPEECH_CACHE_BUCKET:
+        return S3AudioStore(SPEECH_CACHE_BUCKET)
+    return DirAudioStore()
@@ -0,0 +1,239 @@
+from utils.aws_clients import ddb
+from utils.logger import get_logger
+from utils.http import EnhancedJSONEncoder
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/cache")
+CACHE_TMP_MAX_BYTES = int(os.getenv("CACHE_TMP_MAX_BYTES", str(64 * 1024 * 1024)))  # default 64 MB
+CACHE_TABLE_NAME = os.getenv("DDB_TABLE_TECO_CACHE")  # optional shared L2 table
+CACHE_RETENTION_SECONDS = int(os.getenv("CACHE_RETENTION_SECONDS", "86400"))  # default 1 day
+
+# DynamoDB items are capped at 400 KB; leave room for the key and metadata
+_DDB_MAX_PAYLOAD = 350 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+def _dumps(envelope):
+    raw = json.dumps(envelope, cls=EnhancedJSONEncoder, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+def _loads(payload):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# L2 stores
+# ---------------------------------------------------------------------------
+class FileStore:
+    """Size-bounded store under /tmp; survives warm starts of one container."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_TMP_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def read(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, payload, expires_at):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        evict_directory(self.directory, self.max_bytes)
+
+
+def evict_directory(directory, max_bytes):
+    """Drop least recently written files until the directory fits max_bytes."""
+    entries, total = [], 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+class DynamoStore:
+    """Shared store across containers; 'expires_at' is the table's TTL attribute."""
+
+    def __init__(self, table_name):
+        self.table = ddb.Table(table_name)
+
+    def read(self, key):
+        item = self.table.get_item(Key={"cache_key": key}).get("Item")
+        if not item or int(item.get("expires_at", 0)) <= time.time():
+            return None
+        payload = item.get("payload")
+        return bytes(getattr(payload, "value", payload))
+
+    def write(self, key, payload, expires_at):
+        if len(payload) > _DDB_MAX_PAYLOAD:
+            logger.warning(f"[CACHE] Skipping DynamoDB write for {key}: {len(payload)} bytes")
+            return
+        self.table.put_item(Item={"cache_key": key, "payload": payload, "expires_at": int(expires_at)})
+
+    def delete(self, key):
+        self.table.delete_item(Key={"cache_key": key})
+
+
+def default_stores():
+    stores = [FileStore()]
+    if CACHE_TABLE_NAME:
+        stores.append(DynamoStore(CACHE_TABLE_NAME))
+    return stores
+
+
+# ---------------------------------------------------------------------------
+# Two-tier cache
+# ---------------------------------------------------------------------------
+class TieredCache:
+    """
+    L1: in-process dict. L2: /tmp file store plus optional DynamoDB table.
+
+    Entries are fresh for `ttl` seconds. L2 keeps them for `retention`
+    seconds so callers can still use a stale entry as the baseline for an
+    incremental refresh after a cold start.
+    """
+
+    def __init__(self, namespace, ttl, retention=CACHE_RETENTION_SECONDS, stores=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.retention = max(retention, ttl)
+        self.stores = default_stores() if stores is None else stores
+        self._l1 = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get_entry(self, key):
+        """
+        Return (value, stored_at) regardless of freshness, or None. A stale L1
+        entry is only returned when no store holds a newer one, so a warm
+        container picks up a refresh another container already wrote.
+        """
+        with self._lock:
+            entry = self._l1.get(key)
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry
+        return self._read_l2(key, newer_than=entry[1] if entry else None) or entry
+
+    def _read_l2(self, key, newer_than=None):
+        full_key = self._key(key)
+        for i, store in enumerate(self.stores):
+            try:
+                payload = store.read(full_key)
+                if payload is None:
+                    continue
+                envelope = _loads(payload)
+            except Exception as e:
+                logger.warning(f"[CACHE] L2 read failed for {full_key}: {e}")
+                continue
+            stored_at = envelope.get("t", 0)
+            if stored_at + self.retention <= time.time():
+                continue
+            if newer_than is not None and stored_at <= newer_than:
+                continue  # same copy as L1 (or older); a slower store may be newer
+            entry = (envelope.get("v"), stored_at)
+            with self._lock:
+                self._l1[key] = entry
+            # Promote into the faster stores that missed
+            for faster in self.stores[:i]:
+                self._write(faster, full_key, payload, entry[1])
+            return entry
+        return None
+
+    def get(self, key):
+        """Return the cached value if it is still fresh, else None."""
+        entry = self.get_entry(key)
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def set(self, key, value):
+        stored_at = time.time()
+        with self._lock:
+            self._l1[key] = (value, stored_at)
+        payload = _dumps({"t": stored_at, "v": value})
+        for store in self.stores:
+            self._write(store, self._key(key), payload, stored_at)
+        return value
+
+    def expire(self, key):
+        """Mark an entry stale but keep it as a refresh baseline."""
+        entry = self.get_entry(key)
+        if not entry:
+            return
+        stored_at = time.time() - self.ttl
+        with self._lock:
+            self._l1[key] = (entry[0], stored_at)
+        payload = _dumps({"t": stored_at, "v": entry[0]})
+        for store in self.stores:
+            self._write(store, self._key(key), payload, stored_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+        for store in self.stores:
+            try:
+                store.delete(self._key(key))
+            except Exception as e:
+                logger.warning(f"[CACHE] L2 delete failed for {self._key(key)}: {e}")
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = self.set(key, loader())
+        return value
+
+    def _write(self, store, full_key, payload, stored_at):
+        try:
+            store.write(full_key, payload, stored_at + self.retention)
+        except Exception as e:
+            logger.warning(f"[CACHE] L2 write failed for {full_key}: {e}")
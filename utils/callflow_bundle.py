@@ -0,0 +1,29 @@
+from utils.cache import TieredCache
+from utils.logger import get_logger
+import os
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Shared cache for the call-flow bundle (configs + prompts per business group
+# and channel). The config and prompt routes invalidate it on every write.
+# ---------------------------------------------------------------------------
+CALLFLOW_BUNDLE_TTL = int(os.getenv("CALLFLOW_BUNDLE_TTL", "300"))
+BUNDLE_CACHE = TieredCache("callflow-bundle", ttl=CALLFLOW_BUNDLE_TTL)
+
+
+def bundle_cache_key(business_group: str, channel_type: str) -> str:
+    return f"{business_group}|{channel_type}"
+
+
+def invalidate_callflow_bundle(business_group: str, *channels):
+    """Drop cached bundles a write to `channels` can affect ('generic' spans every channel)."""
+    if not business_group:
+        return
+    channels = {"generic", *(ch for ch in channels if ch)}
+    for ch in channels:
+        BUNDLE_CACHE.delete(bundle_cache_key(business_group, ch))
+    logger.info(f"[BUNDLE] Invalidated BG={business_group}, channels={sorted(channels)}")
@@ -0,0 +1,91 @@
+from utils.aws_clients import connect
+from utils.logger import get_logger
+from utils.cache import TieredCache
+import os
+import re
+import threading
+import time
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+CONNECT = connect
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+INSTANCE_ID = os.getenv("CONNECT_INSTANCE_ID")
+CONNECT_NAME_CACHE_TTL = int(os.getenv("CONNECT_NAME_CACHE_TTL", "900"))
+
+# A miss triggers at most one out-of-band refresh per interval
+MIN_REFRESH_INTERVAL = 60
+
+UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+# {"contactFlows": {name: id}, "quickConnects": {name: id}}
+_NAMES = TieredCache("connect-names", ttl=CONNECT_NAME_CACHE_TTL)
+_REFRESH = {"last": 0}
+_REFRESH_LOCK = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+def _list_names(operation, list_key, instance_id):
+    names = {}
+    paginator = CONNECT.get_paginator(operation)
+    for page in paginator.paginate(InstanceId=instance_id):
+        for s in page.get(list_key, []):
+            if s.get("Name") and s.get("Id"):
+                names.setdefault(s["Name"], s["Id"])
+    return names
+
+
+def _build_index(instance_id):
+    index = {
+        "contactFlows": _list_names("list_contact_flows", "ContactFlowSummaryList", instance_id),
+        "quickConnects": _list_names("list_quick_connects", "QuickConnectSummaryList", instance_id),
+    }
+    logger.info(f"[NAMES] Indexed {len(index['contactFlows'])} contact flows, "
+                f"{len(index['quickConnects'])} quick connects")
+    return index
+
+
+def _refresh(instance_id):
+    with _REFRESH_LOCK:
+        if time.time() - _REFRESH["last"] < MIN_REFRESH_INTERVAL:
+            return None
+        _REFRESH["last"] = time.time()
+    return _NAMES.set(instance_id, _build_index(instance_id))
+
+
+def _resolve(kind, ref, instance_id):
+    if not ref or UUID_RE.match(str(ref)):
+        return ref
+    instance_id = instance_id or INSTANCE_ID
+
+    index = _NAMES.get(instance_id)
+    if index is None:
+        index = _refresh(instance_id) or (_NAMES.get_entry(instance_id) or ({},))[0]
+    found = (index.get(kind) or {}).get(ref)
+    if found:
+        return found
+
+    # Possibly created since the last refresh
+    index = _refresh(instance_id) or {}
+    found = (index.get(kind) or {}).get(ref)
+    if not found:
+        raise LookupError(f"Unknown {'contact flow' if kind == 'contactFlows' else 'quick connect'} '{ref}'")
+    return found
+
+
+def resolve_contact_flow_id(name_or_id, instance_id=None):
+    """Contact flow id for a name (ids pass through), from a TTL-cached index."""
+    return _resolve("contactFlows", name_or_id, instance_id)
+
+
+def resolve_quick_connect_id(name_or_id, instance_id=None):
+    """Quick connect id for a name (ids pass through), from a TTL-cached index."""
+    return _resolve("quickConnects", name_or_id, instance_id)
@@ -0,0 +1,256 @@
+from utils.aws_clients import ddb, table
+from utils.logger import get_logger
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer
+import os
+import time
+import zlib
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+EMAIL_TEMPLATES_TABLE = table("DDB_TABLE_TECO_EMAIL_TEMPLATES", "teco_email_templates")
+TEMPLATE_KEY = os.getenv("EMAIL_TEMPLATE_KEY", "template_id")
+SUBJECT_FIELD = os.getenv("EMAIL_TEMPLATE_SUBJECT_FIELD", "subject")
+BODY_FIELD = os.getenv("EMAIL_TEMPLATE_BODY_FIELD", "body")
+VERSION_FIELD = os.getenv("EMAIL_TEMPLATE_VERSION_FIELD", "updated_at")
+
+# Large bodies may be stored zlib-compressed as a Binary attribute instead
+COMPRESSED_BODY_FIELD = f"{BODY_FIELD}_z"
+BODY_ENCODING_FIELD = f"{BODY_FIELD}_encoding"
+BODY_COMPRESS_THRESHOLD = int(os.getenv("EMAIL_TEMPLATE_COMPRESS_THRESHOLD", "4096"))  # bytes
+
+# Routing-profile -> template fan-out table (optional until backfilled).
+# Partition key: routing_profile_name (S), sort key: TEMPLATE_KEY (S).
+PROFILE_INDEX_TABLE_NAME = os.getenv("DDB_TABLE_TECO_EMAIL_TEMPLATE_PROFILE_INDEX")
+PROFILE_INDEX_KEY = "routing_profile_name"
+PROFILE_INDEX_TABLE = ddb.Table(PROFILE_INDEX_TABLE_NAME) if PROFILE_INDEX_TABLE_NAME else None
+
+# Attributes returned by the picker (summary) view
+SUMMARY_FIELDS = [TEMPLATE_KEY] + [
+    f.strip() for f in os.getenv("EMAIL_TEMPLATE_SUMMARY_FIELDS", f"template_name,{SUBJECT_FIELD},{VERSION_FIELD}").split(",")
+    if f.strip()
+]
+
+BATCH_GET_LIMIT = 100  # BatchGetItem max keys per request
+
+_deserializer = TypeDeserializer()
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def routing_profiles(item) -> set:
+    """Routing profiles a template is published to (set, list or comma-separated string)."""
+    raw = (item or {}).get("routing_profile")
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, (set, list, tuple)):
+        return set()
+    return {str(p).strip() for p in raw if str(p).strip()}
+
+
+def compress_body(item, threshold=BODY_COMPRESS_THRESHOLD):
+    """Return a copy of the item with a large body stored zlib-compressed."""
+    body = (item or {}).get(BODY_FIELD)
+    if not isinstance(body, str) or len(body.encode("utf-8")) < threshold:
+        return item
+    out = {k: v for k, v in item.items() if k != BODY_FIELD}
+    out[COMPRESSED_BODY_FIELD] = zlib.compress(body.encode("utf-8"), 9)
+    out[BODY_ENCODING_FIELD] = "zlib"
+    return out
+
+
+def decompress_body(item):
+    """Restore a compressed body in place (no-op for plain items)."""
+    if not item or COMPRESSED_BODY_FIELD not in item:
+        return item
+    raw = item.pop(COMPRESSED_BODY_FIELD)
+    encoding = item.pop(BODY_ENCODING_FIELD, "zlib")
+    raw = bytes(getattr(raw, "value", raw))
+    item[BODY_FIELD] = zlib.decompress(raw).decode("utf-8") if encoding == "zlib" else raw.decode("utf-8")
+    return item
+
+
+def _projection(fields):
+    """ProjectionExpression kwargs with placeholders (avoids reserved words)."""
+    if not fields:
+        return {}
+    names = {f"#p{i}": f for i, f in enumerate(fields)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+
+def _query_all(tbl, **kwargs):
+    items = []
+    while True:
+        result = tbl.query(**kwargs)
+        items.extend(result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            return items
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+def _scan_all(tbl, **kwargs):
+    items = []
+    while True:
+        result = tbl.scan(**kwargs)
+        items.extend(result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            return items
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+def query_templates_for_profile(routing_profile_name: str, fields=None) -> list:
+    """
+    Templates published to a routing profile, optionally projected to `fields`.
+    Index rows carry only the key and summary attributes: a summary
+    projection is served by one (paginated) Query on them, anything else
+    resolves the ids from that Query with BatchGetItem. Falls back to a
+    paginated scan when the index table is not configured. Both paths match
+    the profile name exactly (see routing_profiles).
+    """
+    if PROFILE_INDEX_TABLE is None:
+        logger.info("[INDEX] Profile index not configured, scanning templates table")
+        scan_fields = list(dict.fromkeys([*fields, "routing_profile"])) if fields else None
+        items = _scan_all(
+            EMAIL_TEMPLATES_TABLE,
+            FilterExpression=Attr("routing_profile").contains(routing_profile_name),
+            **_projection(scan_fields),
+        )
+        # contains() is a substring test on string attributes; keep exact matches only
+        items = [t for t in items if routing_profile_name in routing_profiles(t)]
+        if fields and "routing_profile" not in fields:
+            for item in items:
+                item.pop("routing_profile", None)
+        return items
+
+    # Summary projections are answered by the small index rows alone
+    summary_only = bool(fields) and set(fields) <= set(SUMMARY_FIELDS)
+    rows = _query_all(
+        PROFILE_INDEX_TABLE,
+        KeyConditionExpression=Key(PROFILE_INDEX_KEY).eq(routing_profile_name),
+        **_projection(fields if summary_only else [TEMPLATE_KEY]),
+    )
+    if summary_only:
+        return rows
+    return get_templates_by_ids([row.get(TEMPLATE_KEY) for row in rows], fields)
+
+
+def index_row(item, profile) -> dict:
+    """Fan-out row for one profile: the key and summary attributes only."""
+    row = {f: item[f] for f in SUMMARY_FIELDS if f in item}
+    row[PROFILE_INDEX_KEY] = profile
+    return row
+
+
+def get_templates_by_ids(template_ids, fields=None, max_retries=5) -> list:
+    """Fetch full templates by id with BatchGetItem, preserving the requested order."""
+    ids = list(dict.fromkeys(t for t in template_ids if t))
+    found = {}
+    for i in range(0, len(ids), BATCH_GET_LIMIT):
+        request = {EMAIL_TEMPLATES_TABLE.name: {
+            "Keys": [{TEMPLATE_KEY: t} for t in ids[i:i + BATCH_GET_LIMIT]],
+            **_projection(fields),
+        }}
+        for attempt in range(max_retries + 1):
+            result = ddb.batch_get_item(RequestItems=request)
+            for item in result.get("Responses", {}).get(EMAIL_TEMPLATES_TABLE.name, []):
+                found[item.get(TEMPLATE_KEY)] = item
+            request = result.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            time.sleep(min(0.05 * 2 ** attempt, 1.0))
+        else:
+            logger.warning(f"[BATCH GET] Gave up on unprocessed keys after {max_retries} retries")
+    return [found[t] for t in ids if t in found]
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+def sync_template_index(new_item, old_item=None):
+    """
+    Bring the fan-out rows for one template in line with its current state.
+    Pass new_item=None for a deleted template. Returns the affected profiles.
+    """
+    new_profiles = routing_profiles(new_item)
+    old_profiles = routing_profiles(old_item)
+    if PROFILE_INDEX_TABLE is None:
+        return new_profiles | old_profiles
+
+    template_id = (new_item or old_item or {}).get(TEMPLATE_KEY)
+    if not template_id:
+        logger.warning(f"[INDEX] Template without '{TEMPLATE_KEY}' skipped")
+        return set()
+
+    with PROFILE_INDEX_TABLE.batch_writer(overwrite_by_pkeys=[PROFILE_INDEX_KEY, TEMPLATE_KEY]) as batch:
+        for profile in new_profiles:
+            batch.put_item(Item=index_row(new_item, profile))
+        for profile in old_profiles - new_profiles:
+            batch.delete_item(Key={PROFILE_INDEX_KEY: profile, TEMPLATE_KEY: template_id})
+
+    return new_profiles | old_profiles
+
+
+def apply_stream_records(records) -> set:
+    """Apply DynamoDB Stream records from the templates table to the index."""
+    affected = set()
+    for record in records or []:
+        ddb_data = record.get("dynamodb", {})
+        new_image = {k: _deserializer.deserialize(v) for k, v in (ddb_data.get("NewImage") or {}).items()}
+        old_image = {k: _deserializer.deserialize(v) for k, v in (ddb_data.get("OldImage") or {}).items()}
+        if record.get("eventName") == "REMOVE":
+            new_image = None
+        affected |= sync_template_index(new_image or None, old_image or None)
+    return affected
+
+
+def backfill_compressed_bodies(threshold=BODY_COMPRESS_THRESHOLD, dry_run=False) -> dict:
+    """
+    Rewrite plain bodies at or above `threshold` bytes as compressed Binary
+    attributes. Templates edited since the scan are left alone and counted
+    as skipped.
+    """
+    stats = {"templates": 0, "compressed": 0, "skipped": 0, "bytesBefore": 0, "bytesAfter": 0}
+    for item in _scan_all(EMAIL_TEMPLATES_TABLE):
+        stats["templates"] += 1
+        packed = compress_body(item, threshold)
+        if packed is item:
+            continue
+        if not dry_run:
+            # Only replace the body if nobody changed it since the scan
+            try:
+                EMAIL_TEMPLATES_TABLE.update_item(
+                    Key={TEMPLATE_KEY: item[TEMPLATE_KEY]},
+                    UpdateExpression="SET #z = :z, #e = :e REMOVE #b",
+                    ConditionExpression="#b = :old",
+                    ExpressionAttributeNames={"#z": COMPRESSED_BODY_FIELD, "#e": BODY_ENCODING_FIELD, "#b": BODY_FIELD},
+                    ExpressionAttributeValues={":z": packed[COMPRESSED_BODY_FIELD], ":e": "zlib", ":old": item[BODY_FIELD]},
+                )
+            except ddb.meta.client.exceptions.ConditionalCheckFailedException:
+                logger.info(f"[BACKFILL] {item[TEMPLATE_KEY]} changed during the run, skipped")
+                stats["skipped"] += 1
+                continue
+        stats["compressed"] += 1
+        stats["bytesBefore"] += len(item[BODY_FIELD].encode("utf-8"))
+        stats["bytesAfter"] += len(packed[COMPRESSED_BODY_FIELD])
+    return stats
+
+
+def backfill_template_index(dry_run=False) -> dict:
+    """Rebuild fan-out rows for every existing template."""
+    stats = {"templates": 0, "rows": 0}
+    for item in _scan_all(EMAIL_TEMPLATES_TABLE):
+        profiles = routing_profiles(item)
+        stats["templates"] += 1
+        stats["rows"] += len(profiles)
+        if not dry_run:
+            sync_template_index(item)
+    return stats
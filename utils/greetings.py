@@ -0,0 +1,41 @@
+from utils.logger import get_logger
+from utils.s3_stream import MIN_PART_SIZE, MultipartWriter
+from utils.wav import TELEPHONY_RATE, WavError, transcode_stream
+import os
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+GREETING_TRANSCODE = os.getenv("GREETING_TRANSCODE", "true").lower() == "true"
+GREETING_ENCODING = os.getenv("GREETING_ENCODING", "pcm")  # pcm (16-bit) | mulaw
+GREETING_SAMPLE_RATE = int(os.getenv("GREETING_SAMPLE_RATE", str(TELEPHONY_RATE)))
+
+ENCODINGS = {"pcm", "mulaw"}
+
+
+def write_greeting(client, bucket, key, chunks, total_size=None, encoding=None) -> dict:
+    """
+    Store a WAV delivered as byte chunks at `key`. Unless GREETING_TRANSCODE is
+    off, the stored copy is mono GREETING_SAMPLE_RATE audio (16-bit PCM or
+    mu-law). Raises WavError for unsupported input; nothing is written then.
+    """
+    encoding = encoding or GREETING_ENCODING
+    with MultipartWriter(client, bucket, key, "audio/wav", part_size=MIN_PART_SIZE) as out:
+        if GREETING_TRANSCODE:
+            stats = transcode_stream(
+                chunks, out.write, total_size, mulaw=encoding == "mulaw", target_rate=GREETING_SAMPLE_RATE
+            )
+        else:
+            for chunk in chunks:
+                if out.bytes_written == 0 and not (chunk[:4] == b"RIFF" and chunk[8:12] == b"WAVE"):
+                    raise WavError("Not a RIFF/WAVE file.")
+                out.write(chunk)
+            stats = {"encoding": "original"}
+        stats["bytes"] = out.bytes_written
+    logger.info(f"[GREETING] Stored s3://{bucket}/{key}: {stats}")
+    return stats
@@ -24,3 +24,11 @@ def respond(status, payload):
         "headers": cors_headers(),
         "body": json.dumps(payload, cls=EnhancedJSONEncoder)
     }
+
+def respond_serialized(status, body, extra_headers=None):
+    """Like respond(), for a body that is already a JSON string (e.g. cached)."""
+    return {
+        "statusCode": status,
+        "headers": {**cors_headers(), **(extra_headers or {})},
+        "body": body
+    }
@@ -0,0 +1,139 @@
+from utils.aws_clients import connect
+from utils.logger import get_logger
+from utils.cache import TieredCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timezone
+import time
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+CONNECT = connect
+
+# 10-15 concurrent threads is safe for Connect API
+MAX_DESCRIBE_WORKERS = 15
+
+# Shared catalog: {name: {"name", "values", "lastModifiedTime", "lastModifiedRegion"}}
+_CATALOG = TieredCache("predefined-attributes", ttl=300)  # 5-minute shared cache
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _iso(dt):
+    if not dt:
+        return None
+    try:
+        return dt.astimezone(timezone.utc).isoformat()
+    except Exception:
+        return str(dt)
+
+
+def paginate_list_predefined_attributes(instance_id):
+    paginator = CONNECT.get_paginator("list_predefined_attributes")
+    for page in paginator.paginate(InstanceId=instance_id):
+        for s in page.get("PredefinedAttributeSummaryList", []):
+            yield s
+
+
+def describe_predefined_attribute(instance_id, name):
+    resp = CONNECT.describe_predefined_attribute(InstanceId=instance_id, Name=name)
+    pa = resp.get("PredefinedAttribute", {}) or {}
+    values_obj = pa.get("Values") or {}
+    values = values_obj.get("StringList", [])
+    return {
+        "name": pa.get("Name") or name,
+        "values": values,
+        "lastModifiedTime": _iso(pa.get("LastModifiedTime")),
+        "lastModifiedRegion": pa.get("LastModifiedRegion"),
+    }
+
+
+def refresh_predefined_attributes(instance_id, cached=None):
+    """
+    Incrementally refresh the attribute catalog.
+
+    Only attributes whose LastModifiedTime differs from the cached copy (or
+    that are new) are described, concurrently; attributes no longer listed
+    are dropped.
+    """
+    cached = cached or {}
+    current, stale = {}, []
+    for summary in paginate_list_predefined_attributes(instance_id):
+        name = summary.get("Name")
+        if not name:
+            continue
+        marker = _iso(summary.get("LastModifiedTime"))
+        prev = cached.get(name)
+        if prev and marker and prev.get("lastModifiedTime") == marker:
+            current[name] = prev
+        else:
+            stale.append(name)
+
+    reused = len(current)
+
+    def fetch_detail(name):
+        try:
+            return describe_predefined_attribute(instance_id, name)
+        except Exception as e:
+            logger.warning(f"Describe failed for {name}: {e}")
+            return None
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=MAX_DESCRIBE_WORKERS) as executor:
+            futures = {executor.submit(fetch_detail, n): n for n in stale}
+            for f in as_completed(futures):
+                name = futures[f]
+                d = f.result()
+                if d:
+                    current[d["name"]] = d
+                elif name in cached:
+                    # Keep the last known good copy if the describe failed
+                    current[name] = cached[name]
+
+    logger.info(
+        f"[REFRESH] {len(current)} attributes: described {len(stale)}, "
+        f"reused {reused}, dropped {len(set(cached) - set(current))}"
+    )
+    return current
+
+
+def get_predefined_attribute_catalog(instance_id):
+    """
+    Return the cached attribute catalog, refreshing it once the TTL expires.
+    A stale entry (e.g. from /tmp or DynamoDB after a cold start) is used as
+    the baseline, so only changed attributes are described.
+    """
+    entry = _CATALOG.get_entry(instance_id)
+    if entry and time.time() - entry[1] < _CATALOG.ttl:
+        logger.info("[CACHE] Returning cached predefined attribute catalog")
+        return entry[0]
+
+    attributes = refresh_predefined_attributes(instance_id, entry[0] if entry else None)
+    return _CATALOG.set(instance_id, attributes)
+
+
+def invalidate_predefined_attribute_catalog(instance_id):
+    """Force the next read to refresh (incrementally) after a write."""
+    _CATALOG.expire(instance_id)
+
+
+def sorted_attributes(attributes):
+    """Catalog entries in a deterministic (case-insensitive name) order."""
+    return [attributes[n] for n in sorted(attributes, key=lambda n: (n.lower(), n))]
+
+
+def flatten_proficiencies(attributes):
+    """
+    Build the flattened 'Attribute=Value (Lx)' list in a single pass.
+    Attributes are visited in name order and values in their stored order,
+    so the level index is stable across refreshes.
+    """
+    combined, index = [], 1
+    for detail in sorted_attributes(attributes):
+        for val in detail["values"] or []:
+            combined.append(f"{detail['name']}={val} (L{index})")
+            index += 1
+    combined.sort(key=lambda x: x.lower())
+    return combined
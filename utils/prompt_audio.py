@@ -0,0 +1,147 @@
+from utils.logger import get_logger
+from utils.audio_cache import CONTENT_TYPES, SPEECH_CACHE_BUCKET, audio_cache_key
+from utils.speech_chunks import SSMLSplitError, synthesize_chunked
+from utils.work_queue import RETRYABLE_ERRORS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.exceptions import ClientError
+import boto3
+import os
+import time
+
+# ---------------------------------------------------------------------------
+# Logging & AWS Clients
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+POLLY = boto3.client("polly")
+S3 = boto3.client("s3")
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+PROMPT_AUDIO_BUCKET = os.getenv("PROMPT_AUDIO_BUCKET", SPEECH_CACHE_BUCKET)
+PROMPT_AUDIO_PREFIX = os.getenv("PROMPT_AUDIO_PREFIX", "prompt-audio/")
+# Prompt item attributes holding the text to speak, tried in order
+PROMPT_TEXT_FIELDS = [f.strip() for f in os.getenv("PROMPT_TEXT_FIELDS", "prompt_text,text,prompt").split(",") if f.strip()]
+PROMPT_SYNTHESIS_WORKERS = int(os.getenv("PROMPT_SYNTHESIS_WORKERS", "8"))
+PROMPT_MAX_CHARS = 2500  # Polly per-request budget; longer prompts are chunked
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+def prompt_audio_prefix(business_group, channel):
+    return f"{PROMPT_AUDIO_PREFIX}{business_group}/{channel}/"
+
+
+def prompt_audio_key(business_group, channel, prompt_id, content_hash, fmt):
+    """s3://PROMPT_AUDIO_BUCKET/{prefix}{bg}/{channel}/{prompt_id}/{content_hash}.{fmt}"""
+    return f"{prompt_audio_prefix(business_group, channel)}{prompt_id}/{content_hash}.{fmt}"
+
+
+def existing_audio_keys(business_group, channel):
+    """All audio objects for a business group/channel in one paginated listing."""
+    keys = set()
+    paginator = S3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=PROMPT_AUDIO_BUCKET, Prefix=prompt_audio_prefix(business_group, channel)):
+        keys.update(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+
+def prompt_text(item):
+    for field in PROMPT_TEXT_FIELDS:
+        value = item.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Synthesis
+# ---------------------------------------------------------------------------
+def _synthesize(params):
+    # Sequential chunks: prompts are already synthesized concurrently
+    audio, _ = synthesize_chunked(POLLY, params, PROMPT_MAX_CHARS)
+    if audio is None:
+        raise RuntimeError("Polly returned no AudioStream")
+    return audio
+
+
+def plan_prompt_synthesis(items, business_group, channel, defaults, existing):
+    """
+    Split prompt items into (jobs, skipped). A job is synthesized only when no
+    object exists for the prompt's current content hash, so unchanged prompts
+    cost nothing on re-runs.
+    """
+    jobs, skipped = [], []
+    for item in items:
+        prompt_id = item.get("prompt_id")
+        text = prompt_text(item)
+        if not prompt_id or not text:
+            skipped.append({"promptId": prompt_id, "reason": "NoText"})
+            continue
+        params = {
+            "Engine": item.get("engine") or defaults["engine"],
+            "LanguageCode": item.get("language_code") or defaults["language_code"],
+            "TextType": "ssml" if text.startswith("<speak") else "text",
+            "Text": text,
+            "OutputFormat": defaults["output_format"],
+            "VoiceId": item.get("voice") or defaults["voice"],
+        }
+        key = prompt_audio_key(business_group, channel, prompt_id, audio_cache_key(params), params["OutputFormat"])
+        if key in existing:
+            skipped.append({"promptId": prompt_id, "callflowName": item.get("callflow_name"), "key": key,
+                            "reason": "Unchanged"})
+        else:
+            jobs.append({"promptId": prompt_id, "callflowName": item.get("callflow_name"), "key": key, "params": params})
+    return jobs, skipped
+
+
+def synthesize_prompt(job):
+    """Synthesize one planned prompt and store it; returns a result row (never raises)."""
+    try:
+        audio = _synthesize(job["params"])
+        fmt = job["params"]["OutputFormat"]
+        S3.put_object(
+            Bucket=PROMPT_AUDIO_BUCKET, Key=job["key"], Body=audio,
+            ContentType=CONTENT_TYPES.get(fmt, "application/octet-stream"),
+        )
+        return {"promptId": job["promptId"], "callflowName": job["callflowName"], "key": job["key"], "bytes": len(audio)}
+    except ClientError as e:
+        err = e.response.get("Error", {})
+        code = err.get("Code", "ClientError")
+        logger.warning(f"[PROMPT AUDIO] {job['promptId']} failed: [{code}] {err.get('Message')}")
+        return {"promptId": job["promptId"], "error": code, "message": err.get("Message", str(e)),
+                "retryable": code in RETRYABLE_ERRORS}
+    except SSMLSplitError as e:
+        logger.warning(f"[PROMPT AUDIO] {job['promptId']} failed: {e}")
+        return {"promptId": job["promptId"], "error": "BadRequest", "message": str(e), "retryable": False}
+    except Exception as e:
+        logger.exception(f"[PROMPT AUDIO] {job['promptId']} failed")
+        return {"promptId": job["promptId"], "error": "InternalServerError", "message": str(e), "retryable": False}
+
+
+def run_prompt_synthesis(jobs, on_progress=None, deadline=None, progress_every=10):
+    """
+    Synthesize jobs concurrently. `on_progress(results)` is called every
+    `progress_every` completions; jobs not started before `deadline` (epoch
+    seconds) are returned as remaining. Returns (results, remaining).
+    """
+    results, remaining = [], []
+    with ThreadPoolExecutor(max_workers=PROMPT_SYNTHESIS_WORKERS) as executor:
+        futures, pending = [], list(jobs)
+        # Submit in waves so a deadline stops new work instead of queuing everything
+        while pending or futures:
+            while pending and len(futures) < PROMPT_SYNTHESIS_WORKERS * 2:
+                if deadline and time.time() >= deadline:
+                    remaining.extend(pending)
+                    pending = []
+                    break
+                futures.append(executor.submit(synthesize_prompt, pending.pop(0)))
+            if not futures:
+                break
+            done = next(as_completed(futures))
+            futures.remove(done)
+            results.append(done.result())
+            if on_progress and len(results) % progress_every == 0:
+                on_progress(results)
+    return results, remaining
@@ -0,0 +1,52 @@
+from utils.logger import get_logger
+import os
+import threading
+import time
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+CONNECT_RATE_LIMIT_RPS = float(os.getenv("CONNECT_RATE_LIMIT_RPS", "5"))
+CONNECT_RATE_LIMIT_BURST = int(os.getenv("CONNECT_RATE_LIMIT_BURST", "10"))
+# Seconds of limited calls a synchronous API request may spend (API Gateway times out at 29 s)
+SYNC_CALL_BUDGET_SECONDS = 20
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by worker threads in one container."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def call(self, fn, *args, **kwargs):
+        self.acquire()
+        return fn(*args, **kwargs)
+
+
+# Shared limiter for Connect control-plane calls issued concurrently
+CONNECT_LIMITER = RateLimiter(CONNECT_RATE_LIMIT_RPS, CONNECT_RATE_LIMIT_BURST)
+
+# Most limited Connect calls one synchronous request can make before the gateway timeout
+MAX_SYNC_CONNECT_CALLS = CONNECT_LIMITER.capacity + int(SYNC_CALL_BUDGET_SECONDS * CONNECT_LIMITER.rate)
@@ -0,0 +1,129 @@
+from utils.logger import get_logger
+import base64
+import re
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024      # S3 minimum for every part but the last
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+B64_CHUNK_CHARS = 1024 * 1024  # multiple of 4 -> 768 KB decoded per step
+
+_WHITESPACE = re.compile(r"\s")
+
+
+class MultipartWriter:
+    """
+    File-like writer that streams into an S3 object. Data is buffered up to
+    one part; objects that never fill a part are sent with a single
+    put_object, larger ones as a multipart upload. Memory stays bounded by
+    part_size regardless of object size.
+
+        with MultipartWriter(S3, bucket, key, "audio/mpeg") as out:
+            for chunk in source:
+                out.write(chunk)
+    """
+
+    def __init__(self, client, bucket, key, content_type="application/octet-stream", part_size=DEFAULT_PART_SIZE):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = None
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=part_number, Body=data
+        )
+        self._parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+
+    def close(self):
+        if self._upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), ContentType=self.content_type
+            )
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+            logger.info(f"[S3] Completed {len(self._parts)}-part upload of s3://{self.bucket}/{self.key}")
+        self._buffer = bytearray()
+
+    def abort(self):
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning(f"[S3] Abort failed for s3://{self.bucket}/{self.key}: {e}")
+            self._upload_id = None
+        self._buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def copy_stream(stream, writer, chunk_size=READ_CHUNK_SIZE):
+    """Pump a readable stream (e.g. a botocore StreamingBody) into a writer; returns bytes copied."""
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return total
+        writer.write(chunk)
+        total += len(chunk)
+
+
+def normalize_b64(data):
+    """Strip a data-URL prefix and any line breaks from a base64 string."""
+    if data.startswith("data:"):
+        data = data[data.index(",") + 1:]
+    if _WHITESPACE.search(data):
+        data = "".join(data.split())  # rare (MIME-wrapped input); costs one copy
+    return data
+
+
+def b64_decoded_size(data):
+    """Decoded length of a normalized base64 string, without decoding it."""
+    return len(data) // 4 * 3 - len(data[-2:]) + len(data[-2:].rstrip("="))
+
+
+def iter_b64decode(data, chunk_chars=B64_CHUNK_CHARS):
+    """
+    Decode a base64 string piecewise so only one chunk of decoded bytes is
+    alive at a time. Accepts an optional data-URL prefix; raises
+    binascii.Error on invalid input.
+    """
+    data = normalize_b64(data)
+    chunk_chars -= chunk_chars % 4
+    for start in range(0, len(data), chunk_chars):
+        yield base64.b64decode(data[start:start + chunk_chars], validate=True)
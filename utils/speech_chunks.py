@@ -0,0 +1,220 @@
+from utils.logger import get_logger
+from concurrent.futures import ThreadPoolExecutor
+import re
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+")
+_TAG = re.compile(r"(<[^>]+>)")
+_SPEAK = re.compile(r"\s*(<speak\b[^>]*>)(.*)</speak>\s*", re.S)
+_ELEMENT = re.compile(r"(<([\w:-]+)\b[^>]*>)(.*)</\2\s*>", re.S)
+
+# Formats whose streams can be joined back to back into one playable clip
+CONCAT_FORMATS = {"mp3", "pcm", "ogg_vorbis"}
+
+
+class SSMLSplitError(ValueError):
+    """Raised for an SSML element that cannot be split below the chunk budget."""
+
+
+# ---------------------------------------------------------------------------
+# Splitting
+# ---------------------------------------------------------------------------
+def _hard_split(text, max_chars):
+    """Split an over-long sentence at word boundaries (or mid-word as a last resort)."""
+    chunks, cur = [], ""
+    for word in text.split():
+        while len(word) > max_chars:
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{cur} {word}" if cur else word
+        if len(candidate) > max_chars:
+            chunks.append(cur)
+            cur = word
+        else:
+            cur = candidate
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _pack(units, max_chars, splittable=True):
+    """Greedily join units (sentences / top-level SSML nodes) into chunks <= max_chars."""
+    chunks, cur = [], ""
+    for unit in (u.strip() for u in units):
+        if not unit:
+            continue
+        if len(unit) > max_chars:
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.extend(_hard_split(unit, max_chars) if splittable else _split_ssml_unit(unit, max_chars))
+            continue
+        candidate = f"{cur} {unit}" if cur else unit
+        if len(candidate) > max_chars:
+            chunks.append(cur)
+            cur = unit
+        else:
+            cur = candidate
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _ssml_units(inner):
+    """
+    Top-level SSML units: a unit ends at a sentence end in bare text or when
+    the tag depth returns to zero, so no chunk ever splits an element.
+    """
+    units, cur, depth = [], "", 0
+    for token in _TAG.split(inner):
+        if not token:
+            continue
+        if token.startswith("<"):
+            cur += token
+            if token.startswith("</"):
+                depth = max(depth - 1, 0)
+            elif not token.endswith("/>") and not token.startswith(("<!--", "<?")):
+                depth += 1
+            if depth == 0:
+                units.append(cur)
+                cur = ""
+        elif depth:
+            cur += token
+        else:
+            sentences = _SENTENCE_END.split(token)
+            for sentence in sentences[:-1]:
+                units.append(cur + sentence)
+                cur = ""
+            cur += sentences[-1]
+    units.append(cur)
+    return units
+
+
+def _top_level_parts(unit):
+    """Bare text runs and whole elements of one SSML unit, in order."""
+    parts, cur, depth = [], "", 0
+    for token in _TAG.split(unit):
+        if not token:
+            continue
+        if token.startswith("<"):
+            if not depth and cur:
+                parts.append(cur)
+                cur = ""
+            cur += token
+            if token.startswith("</"):
+                depth = max(depth - 1, 0)
+            elif not token.endswith("/>") and not token.startswith(("<!--", "<?")):
+                depth += 1
+            if depth == 0:
+                parts.append(cur)
+                cur = ""
+        else:
+            cur += token
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def _split_ssml_unit(unit, max_chars):
+    """
+    Split an over-budget SSML unit inside itself: an element is split at its
+    own sentence/child boundaries with its open and close tags repeated around
+    every piece, so <prosody> or <s> settings carry over to each chunk.
+    """
+    if not _TAG.search(unit):
+        return _hard_split(unit, max_chars)
+    parts = _top_level_parts(unit)
+    if len(parts) > 1:
+        return _pack(parts, max_chars, splittable=False)
+    match = _ELEMENT.fullmatch(unit)
+    if match:
+        open_tag, name, inner = match.groups()
+        close_tag = f"</{name}>"
+        budget = max_chars - len(open_tag) - len(close_tag)
+        if budget > 0 and inner.strip():
+            return [f"{open_tag}{chunk}{close_tag}" for chunk in _pack(_ssml_units(inner), budget, splittable=False)]
+    raise SSMLSplitError(f"SSML element of {len(unit)} chars cannot be split below {max_chars} chars")
+
+
+def split_for_synthesis(text, text_type, max_chars):
+    """
+    Split text into Polly-sized requests at sentence boundaries. SSML is split
+    between top-level elements where possible, inside an element only when it
+    alone exceeds the budget, and each chunk is re-wrapped in the original
+    <speak> tag. Raises SSMLSplitError when an element cannot be split.
+    """
+    if text_type != "ssml":
+        return _pack(_SENTENCE_END.split(text), max_chars)
+
+    match = _SPEAK.fullmatch(text)
+    speak_open, inner = (match.group(1), match.group(2)) if match else ("<speak>", text)
+    budget = max_chars - len(speak_open) - len("</speak>")
+    return [f"{speak_open}{chunk}</speak>" for chunk in _pack(_ssml_units(inner), budget, splittable=False)]
+
+
+# ---------------------------------------------------------------------------
+# Concatenation
+# ---------------------------------------------------------------------------
+def _strip_id3(data, first, last):
+    """Drop ID3v2 headers (all but the first part) and ID3v1 trailers (all but the last)."""
+    if not first and data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        data = data[10 + size:]
+    if not last and len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def concat_audio(parts, output_format):
+    """
+    Join separately synthesized parts into one clip. MP3 frames and raw PCM
+    concatenate directly; Ogg pages form a chained Ogg stream.
+    """
+    if output_format == "mp3":
+        last = len(parts) - 1
+        return b"".join(_strip_id3(p, i == 0, i == last) for i, p in enumerate(parts))
+    if output_format == "pcm":
+        return b"".join(parts)
+    if output_format == "ogg_vorbis":
+        if any(p[:4] != b"OggS" for p in parts if p):
+            raise ValueError("Polly returned an Ogg part that does not start with a page header")
+        return b"".join(parts)
+    raise ValueError(f"Chunked synthesis does not support output format '{output_format}'")
+
+
+# ---------------------------------------------------------------------------
+# Synthesis
+# ---------------------------------------------------------------------------
+def synthesize_bytes(polly, params):
+    """One synthesize_speech call; returns the audio bytes or None if Polly sent no stream."""
+    audio_stream = polly.synthesize_speech(**params).get("AudioStream")
+    return audio_stream.read() if audio_stream else None
+
+
+def synthesize_chunked(polly, params, max_chars, workers=1):
+    """
+    Split text below `max_chars`, synthesize the chunks (concurrently when
+    workers > 1, so latency tracks the slowest chunk) and join the audio.
+    Returns (audio_bytes or None, chunk_count).
+    """
+    chunks = split_for_synthesis(params["Text"], params["TextType"], max_chars)
+    synthesize = lambda chunk: synthesize_bytes(polly, {**params, "Text": chunk})
+    if len(chunks) == 1:
+        return synthesize(chunks[0]), 1
+
+    if workers > 1:
+        logger.info(f"[POLLY] Synthesizing {len(chunks)} chunks in parallel")
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            parts = list(executor.map(synthesize, chunks))
+    else:
+        parts = [synthesize(chunk) for chunk in chunks]
+    if any(p is None for p in parts):
+        return None, len(chunks)
+    return concat_audio(parts, params["OutputFormat"]), len(chunks)
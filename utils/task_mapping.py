@@ -0,0 +1,217 @@
+from utils.aws_clients import ddb
+from utils.logger import get_logger
+import os
+import re
+import threading
+import time
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Environment variables
+# ---------------------------------------------------------------------------
+# Per-template mapping schemas: partition key template_id (S), attribute 'mapping' (M)
+MAPPINGS_TABLE_NAME = os.getenv("DDB_TABLE_TECO_TASK_TEMPLATE_MAPPINGS")
+MAPPINGS_TABLE = ddb.Table(MAPPINGS_TABLE_NAME) if MAPPINGS_TABLE_NAME else None
+MAPPING_CACHE_TTL = int(os.getenv("TASK_MAPPING_CACHE_TTL", "300"))
+
+REFERENCE_TYPES = {"STRING", "NUMBER", "EMAIL", "URL", "DATE"}
+
+# ---------------------------------------------------------------------------
+# Default schema (the task form's original hardcoded mapping)
+#
+# Field specs:
+#   key        Attribute / Reference name to emit
+#   from       form field names or labels to look up, in order (case-insensitive)
+#   type       Reference type (references only)
+#   transform  "str" (default) or "bool" -> "true"/"false"
+#   skipEmpty  omit falsy values instead of only missing ones
+#   required   reject the request when missing
+#   pattern    regex the value must fully match
+#
+# Top-level options: contactFlow / quickConnect (name or id; contactFlowId and
+# quickConnectId are accepted too) and includeScheduledTime.
+# ---------------------------------------------------------------------------
+DEFAULT_SCHEMA = {
+    "name": {"from": ["taskName", "Task Name", "T"], "default": "Task"},
+    "description": {"from": ["description", "Description"], "default": ""},
+    "schedule": {
+        "date": ["scheduleDateTime", "schedule date/time", "date"],
+        "time": ["scheduleTime", "schedule time", "time"],
+    },
+    "attributes": [
+        {"key": "Account_Number", "from": ["Account_Number", "Account Number"]},
+        {"key": "Meter_Number", "from": ["Meter_Number", "Meter Number"]},
+        {"key": "Customer_Type", "from": ["Customer_Type", "Customer Type"], "skipEmpty": True},
+        {"key": "Service_Type", "from": ["Service_Type", "Service Type"], "skipEmpty": True},
+    ],
+    "references": [
+        {"key": "Sample_Email", "from": ["Sample_Email", "Sample Email"], "type": "EMAIL", "skipEmpty": True},
+        {"key": "Self_Assign", "from": ["selfAssign", "Self Assign"], "type": "STRING", "transform": "bool"},
+        {"key": "Sample_Checkbox", "from": ["Sample_Checkbox", "Sample Checkbox"], "type": "STRING", "transform": "bool"},
+    ],
+    # Trace references copied from the top-level request body
+    "bodyReferences": [
+        {"key": "Agent_Name", "from": "agentName"},
+        {"key": "Agent_Routing_Profile", "from": "agentRoutingProfile"},
+        {"key": "Agent_ARN", "from": "agentARN"},
+        {"key": "RoutingProfile_ARN", "from": "agentRoutingProfileARN"},
+    ],
+}
+
+_TRANSFORMS = {
+    "str": str,
+    "bool": lambda v: str(bool(v)).lower(),
+}
+
+
+# ---------------------------------------------------------------------------
+# Compiled mapper
+# ---------------------------------------------------------------------------
+class SchemaError(ValueError):
+    """Raised when a stored mapping schema is malformed."""
+
+
+class FieldIndex:
+    """Form fields indexed once per request by lower-cased name and label."""
+
+    def __init__(self, fields):
+        self.by_name, self.by_label = {}, {}
+        for f in fields or []:
+            if not isinstance(f, dict):
+                continue
+            self.by_name[str(f.get("name", "")).strip().lower()] = f.get("value")
+            self.by_label[str(f.get("label", "")).strip().lower()] = f.get("value")
+
+    def lookup(self, keys):
+        """First non-None value, trying name then label for each candidate."""
+        for key in keys:
+            if self.by_name.get(key) is not None:
+                return self.by_name[key]
+            if self.by_label.get(key) is not None:
+                return self.by_label[key]
+        return None
+
+
+def _compile_spec(spec, reference=False):
+    if not isinstance(spec, dict) or not spec.get("key"):
+        raise SchemaError(f"Field spec needs a 'key': {spec!r}")
+    sources = spec.get("from") or [spec["key"]]
+    if isinstance(sources, str):
+        sources = [sources]
+    transform = spec.get("transform", "str")
+    if transform not in _TRANSFORMS:
+        raise SchemaError(f"Unknown transform '{transform}' for {spec['key']}")
+    ref_type = str(spec.get("type", "STRING")).upper()
+    if reference and ref_type not in REFERENCE_TYPES:
+        raise SchemaError(f"Unknown reference type '{ref_type}' for {spec['key']}")
+    return {
+        "key": spec["key"],
+        "from": [str(s).strip().lower() for s in sources],
+        "rawFrom": [str(s) for s in sources],
+        "transform": _TRANSFORMS[transform],
+        "skipEmpty": bool(spec.get("skipEmpty")),
+        "required": bool(spec.get("required")),
+        "pattern": re.compile(spec["pattern"]) if spec.get("pattern") else None,
+        "type": ref_type,
+    }
+
+
+class TaskMapper:
+    """A mapping schema compiled once; maps form fields to start_task_contact kwargs."""
+
+    def __init__(self, schema):
+        schema = schema or {}
+        name = schema.get("name") or DEFAULT_SCHEMA["name"]
+        description = schema.get("description") or DEFAULT_SCHEMA["description"]
+        schedule = schema.get("schedule") or DEFAULT_SCHEMA["schedule"]
+
+        self.name_from = [str(s).strip().lower() for s in name.get("from", [])]
+        self.name_default = name.get("default", "Task")
+        self.description_from = [str(s).strip().lower() for s in description.get("from", [])]
+        self.description_default = description.get("default", "")
+        self.schedule_date = [str(s).strip().lower() for s in schedule.get("date", [])]
+        self.schedule_time = [str(s).strip().lower() for s in schedule.get("time", [])]
+        self.attributes = [_compile_spec(s) for s in schema.get("attributes", [])]
+        self.references = [_compile_spec(s, reference=True) for s in schema.get("references", [])]
+        self.body_references = [_compile_spec(s, reference=True) for s in schema.get("bodyReferences", [])]
+        # Routing overrides (name or id); the route falls back to its env defaults
+        self.contact_flow = schema.get("contactFlow") or schema.get("contactFlowId")
+        self.quick_connect = schema.get("quickConnect") or schema.get("quickConnectId")
+        self.include_scheduled_time = bool(schema.get("includeScheduledTime"))
+
+    def _emit(self, specs, lookup, errors):
+        out = {}
+        for spec in specs:
+            value = lookup(spec)
+            if value is None or (spec["skipEmpty"] and not value):
+                if spec["required"]:
+                    errors.append(f"'{spec['key']}' is required")
+                continue
+            value = spec["transform"](value)
+            if spec["pattern"] and not spec["pattern"].fullmatch(value):
+                errors.append(f"'{spec['key']}' has an invalid value")
+                continue
+            out[spec["key"]] = value
+        return out
+
+    def map(self, body, fields):
+        """
+        Returns (mapped, errors). `mapped` has name, description, schedule
+        strings, Attributes and References; fields are indexed only once.
+        """
+        index = FieldIndex(fields)
+        errors = []
+        attributes = self._emit(self.attributes, lambda s: index.lookup(s["from"]), errors)
+        references = self._emit(self.references, lambda s: index.lookup(s["from"]), errors)
+        # Body keys are case-sensitive request properties; empty values are skipped
+        references.update(self._emit(
+            self.body_references,
+            lambda s: next((body.get(k) for k in s["rawFrom"] if body.get(k)), None),
+            errors,
+        ))
+        ref_types = {s["key"]: s["type"] for s in self.references + self.body_references}
+
+        return {
+            "name": index.lookup(self.name_from) or self.name_default,
+            "description": index.lookup(self.description_from) or self.description_default,
+            "scheduleDate": index.lookup(self.schedule_date),
+            "scheduleTime": index.lookup(self.schedule_time),
+            "Attributes": attributes,
+            "References": {k: {"Value": v, "Type": ref_types[k]} for k, v in references.items()},
+        }, errors
+
+
+# ---------------------------------------------------------------------------
+# Schema loading (DynamoDB, cached per template)
+# ---------------------------------------------------------------------------
+_DEFAULT_MAPPER = TaskMapper(DEFAULT_SCHEMA)
+_MAPPERS = {}  # {template_id: (TaskMapper, loaded_at)}
+_MAPPERS_LOCK = threading.Lock()
+
+
+def get_task_mapper(template_id=None) -> TaskMapper:
+    """
+    Compiled mapper for a task template. Schemas are read from DynamoDB once
+    per TTL; templates without a stored schema use DEFAULT_SCHEMA.
+    """
+    if not template_id or MAPPINGS_TABLE is None:
+        return _DEFAULT_MAPPER
+
+    now = time.time()
+    with _MAPPERS_LOCK:
+        cached = _MAPPERS.get(template_id)
+    if cached and now - cached[1] < MAPPING_CACHE_TTL:
+        return cached[0]
+
+    item = MAPPINGS_TABLE.get_item(Key={"template_id": template_id}).get("Item")
+    mapper = TaskMapper(item["mapping"]) if item and item.get("mapping") else _DEFAULT_MAPPER
+    if not item:
+        logger.info(f"[MAPPING] No schema stored for template '{template_id}', using default")
+
+    with _MAPPERS_LOCK:
+        _MAPPERS[template_id] = (mapper, now)
+    return mapper
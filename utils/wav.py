@@ -0,0 +1,287 @@
+from array import array
+from itertools import accumulate
+import struct
+import sys
+
+# ---------------------------------------------------------------------------
+# WAV parsing and telephony transcoding (stdlib only)
+#
+# Input:  RIFF/WAVE PCM 8/16/24/32-bit, IEEE float 32-bit, or
+#         WAVE_FORMAT_EXTENSIBLE wrapping either; any channel count/rate.
+# Output: mono, TELEPHONY_RATE (or the source rate if lower), 16-bit PCM
+#         or 8-bit G.711 mu-law. Processing is chunked, so memory is bounded
+#         by the chunk size rather than the clip length.
+# ---------------------------------------------------------------------------
+TELEPHONY_RATE = 8000
+HEADER_PROBE_BYTES = 64 * 1024  # fmt/data chunks must start within this prefix
+
+FORMAT_PCM, FORMAT_FLOAT, FORMAT_MULAW, FORMAT_EXTENSIBLE = 1, 3, 7, 0xFFFE
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class WavError(ValueError):
+    """Raised for input that is not a supported WAV file."""
+
+
+class WavInfo:
+    __slots__ = ("audio_format", "channels", "sample_rate", "bits", "data_offset", "data_size")
+
+    def __init__(self, audio_format, channels, sample_rate, bits, data_offset, data_size):
+        self.audio_format = audio_format
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bits = bits
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+    @property
+    def frame_size(self):
+        return self.channels * self.bits // 8
+
+
+def parse_wav_header(head: bytes, total_size: int = None) -> WavInfo:
+    """
+    Parse the RIFF header from the first bytes of a file. `total_size` (when
+    known) repairs the data size that streaming recorders leave as 0 or
+    0xFFFFFFFF.
+    """
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        raise WavError("Not a RIFF/WAVE file.")
+
+    fmt, offset = None, 12
+    while offset + 8 <= len(head):
+        chunk_id, size = head[offset:offset + 4], struct.unpack_from("<I", head, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if size < 16 or body + 16 > len(head):
+                raise WavError("Truncated fmt chunk.")
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", head, body)
+            if audio_format == FORMAT_EXTENSIBLE and size >= 40 and body + 26 <= len(head):
+                audio_format = struct.unpack_from("<H", head, body + 24)[0]  # SubFormat GUID prefix
+            fmt = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise WavError("data chunk before fmt chunk.")
+            if total_size is not None and (size in (0, 0xFFFFFFFF) or body + size > total_size):
+                size = total_size - body
+            elif size in (0, 0xFFFFFFFF):
+                raise WavError("WAV data size is not set.")
+            info = WavInfo(*fmt, body, size)
+            _check_supported(info)
+            return info
+        offset = body + size + (size & 1)
+    raise WavError("No data chunk found in the WAV header.")
+
+
+def _check_supported(info):
+    if info.channels < 1 or info.sample_rate < 1:
+        raise WavError("Invalid channel count or sample rate.")
+    if info.audio_format == FORMAT_PCM and info.bits in (8, 16, 24, 32):
+        return
+    if info.audio_format == FORMAT_FLOAT and info.bits == 32:
+        return
+    raise WavError(f"Unsupported WAV encoding (format {info.audio_format}, {info.bits}-bit).")
+
+
+# ---------------------------------------------------------------------------
+# Sample conversion
+# ---------------------------------------------------------------------------
+def _to_int16(data: bytes, info: WavInfo) -> array:
+    """Little-endian frames -> signed 16-bit samples (interleaved)."""
+    if info.audio_format == FORMAT_FLOAT:
+        floats = array("f", data)
+        if _BIG_ENDIAN:
+            floats.byteswap()
+        # NaN -> silence, +/-inf and out-of-range samples -> full scale
+        return array("h", (int(max(-1.0, min(1.0, f)) * 32767) if f == f else 0 for f in floats))
+    if info.bits == 8:
+        return array("h", ((b - 128) << 8 for b in data))
+    if info.bits == 16:
+        samples = array("h", data)
+    else:
+        # Keep the two most significant bytes of each 24/32-bit sample
+        width = info.bits // 8
+        packed = bytearray(len(data) // width * 2)
+        packed[0::2] = data[width - 2::width]
+        packed[1::2] = data[width - 1::width]
+        samples = array("h", bytes(packed))
+    if _BIG_ENDIAN:
+        samples.byteswap()
+    return samples
+
+
+def _downmix(samples: array, channels: int) -> list:
+    if channels == 1:
+        return samples.tolist()
+    if channels == 2:
+        return [(l + r) >> 1 for l, r in zip(samples[0::2], samples[1::2])]
+    return [sum(frame) // channels for frame in zip(*(samples[c::channels] for c in range(channels)))]
+
+
+def _build_mulaw_table():
+    """G.711 mu-law code for every 14-bit sample (index = (sample16 >> 2) & 0x3FFF)."""
+    table = bytearray(16384)
+    for index in range(16384):
+        sample = (index - 16384 if index >= 8192 else index) << 2
+        sign = 0x80 if sample < 0 else 0
+        magnitude = min(abs(sample), 32635) + 0x84
+        exponent = max(0, min(7, magnitude.bit_length() - 8))
+        mantissa = (magnitude >> (exponent + 3)) & 0x0F
+        table[index] = ~(sign | (exponent << 4) | mantissa) & 0xFF
+    return bytes(table)
+
+
+_MULAW = None
+
+
+def _mulaw_table():
+    global _MULAW
+    if _MULAW is None:
+        _MULAW = _build_mulaw_table()
+    return _MULAW
+
+
+# ---------------------------------------------------------------------------
+# Streaming transcoder
+# ---------------------------------------------------------------------------
+class TelephonyTranscoder:
+    """
+    Downmix + box-filter resample + (optionally) mu-law encode, fed in
+    arbitrary byte chunks of the source data chunk:
+
+        t = TelephonyTranscoder(info, mulaw=True)
+        out.write(t.header())
+        for chunk in source: out.write(t.feed(chunk))
+        out.write(t.flush())
+    """
+
+    def __init__(self, info: WavInfo, mulaw=False, target_rate=TELEPHONY_RATE):
+        self.info = info
+        self.mulaw = mulaw
+        self.rate = min(target_rate, info.sample_rate)  # never upsample
+        in_frames = info.data_size // info.frame_size
+        self.out_frames = in_frames * self.rate // info.sample_rate
+        self._pending = b""      # partial frame carried between chunks
+        self._pos = 0            # input frames consumed
+        self._emitted = 0        # output frames produced
+        self._window = 0         # next output window to close
+        self._carry_sum = 0      # partial output window spanning chunks
+        self._carry_n = 0
+
+    @property
+    def sample_width(self):
+        return 1 if self.mulaw else 2
+
+    @property
+    def data_size(self):
+        return self.out_frames * self.sample_width
+
+    def header(self) -> bytes:
+        data_size = self.data_size
+        pad = data_size & 1
+        if self.mulaw:
+            fmt = struct.pack("<4sIHHIIHHH", b"fmt ", 18, FORMAT_MULAW, 1, self.rate, self.rate, 1, 8, 0)
+            fact = struct.pack("<4sII", b"fact", 4, self.out_frames)
+        else:
+            fmt = struct.pack("<4sIHHIIHH", b"fmt ", 16, FORMAT_PCM, 1, self.rate, self.rate * 2, 2, 16)
+            fact = b""
+        riff_size = 4 + len(fmt) + len(fact) + 8 + data_size + pad
+        return struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE") + fmt + fact + struct.pack("<4sI", b"data", data_size)
+
+    def _resample(self, mono: list) -> list:
+        src, dst = self.info.sample_rate, self.rate
+        if src == dst:
+            self._pos += len(mono)
+            return mono
+        base, end = self._pos, self._pos + len(mono)
+        prefix = [0, *accumulate(mono)]
+        out = []
+        j = self._window
+        while True:
+            win_start, win_end = j * src // dst, (j + 1) * src // dst
+            if win_end > end:
+                break
+            lo = max(win_start, base) - base
+            hi = win_end - base
+            total = self._carry_sum + prefix[hi] - prefix[lo]
+            count = self._carry_n + hi - lo
+            out.append(total // count if count else 0)
+            self._carry_sum = self._carry_n = 0
+            j += 1
+        lo = max(j * src // dst, base) - base
+        self._carry_sum += prefix[-1] - prefix[lo]
+        self._carry_n += len(mono) - lo
+        self._pos = end
+        self._window = j
+        return out
+
+    def _encode(self, samples: list) -> bytes:
+        room = self.out_frames - self._emitted
+        samples = samples[:room]
+        self._emitted += len(samples)
+        if self.mulaw:
+            table = _mulaw_table()
+            return bytes(table[(s >> 2) & 0x3FFF] for s in samples)
+        out = array("h", samples)
+        if _BIG_ENDIAN:
+            out.byteswap()
+        return out.tobytes()
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._pending + data
+        usable = len(data) - len(data) % self.info.frame_size
+        self._pending = data[usable:]
+        if not usable:
+            return b""
+        mono = _downmix(_to_int16(data[:usable], self.info), self.info.channels)
+        return self._encode(self._resample(mono))
+
+    def flush(self) -> bytes:
+        """Pad a short source to the size announced in header() (plus RIFF pad byte)."""
+        missing = self.out_frames - self._emitted
+        tail = self._encode([0] * missing) if missing > 0 else b""
+        return tail + (b"\x00" if self.data_size & 1 else b"")
+
+
+def transcode_stream(chunks, write, total_size=None, mulaw=False, target_rate=TELEPHONY_RATE) -> dict:
+    """
+    Transcode a WAV delivered as an iterable of byte chunks, passing output to
+    `write`. Bytes after the data chunk (LIST/id3 trailers) are ignored.
+    Raises WavError for unsupported input. Returns size/format stats.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= HEADER_PROBE_BYTES:
+            break
+    info = parse_wav_header(head, total_size)
+    transcoder = TelephonyTranscoder(info, mulaw=mulaw, target_rate=target_rate)
+    write(transcoder.header())
+
+    remaining = info.data_size
+    out_bytes = 0
+    for chunk in _prepend(head[info.data_offset:], chunks):
+        if remaining <= 0:
+            break
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        encoded = transcoder.feed(chunk)
+        out_bytes += len(encoded)
+        write(encoded)
+    tail = transcoder.flush()
+    write(tail)
+    return {
+        "sourceRate": info.sample_rate,
+        "sourceChannels": info.channels,
+        "sourceBits": info.bits,
+        "rate": transcoder.rate,
+        "encoding": "mulaw" if mulaw else "pcm16",
+        "bytes": len(transcoder.header()) + out_bytes + len(tail),
+    }
+
+
+def _prepend(first, rest):
+    if first:
+        yield first
+    yield from rest
@@ -0,0 +1,207 @@
+from utils.aws_clients import ddb
+from utils.logger import get_logger
+from boto3.dynamodb.conditions import Key
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+logger = get_logger(__name__)
+
+# ---------------------------------------------------------------------------
+# Ticket lifecycle
+#
+#   queued -> processing -> done | failed
+#                 |
+#                 +-> queued (retry, with a later next_attempt_at)
+#
+# A claimed ticket holds a lease (next_attempt_at = claim time + lease); if the
+# worker dies the lease expires and the ticket is claimed again. Callers size
+# the lease from their own time budget so a running drain never loses it.
+# ---------------------------------------------------------------------------
+QUEUED, PROCESSING, DONE, FAILED = "queued", "processing", "done", "failed"
+
+# AWS error codes that put a ticket back on the queue instead of failing it
+RETRYABLE_ERRORS = {
+    "ThrottlingException", "TooManyRequestsException", "LimitExceededException",
+    "InternalServiceException", "InternalServerError",
+    "ServiceUnavailableException", "ServiceFailureException",
+}
+
+
+class WorkQueueUnavailable(RuntimeError):
+    """No shared queue is configured for this environment."""
+
+
+def _new_ticket_id():
+    return str(uuid.uuid4())
+
+
+class SqliteWorkQueue:
+    """Local stand-in backed by a SQLite file (durable across warm invocations)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS tickets ("
+                " ticket_id TEXT PRIMARY KEY, queue TEXT, status TEXT, payload TEXT, result TEXT,"
+                " attempts INTEGER, created_at REAL, updated_at REAL, next_attempt_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS tickets_ready ON tickets (queue, status, next_attempt_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def enqueue(self, queue, payload):
+        ticket_id, now = _new_ticket_id(), time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO tickets VALUES (?, ?, ?, ?, NULL, 0, ?, ?, ?)",
+                (ticket_id, queue, QUEUED, json.dumps(payload), now, now, now),
+            )
+        return ticket_id
+
+    def claim(self, queue, limit, lease):
+        now = time.time()
+        with self._lock, self._connect() as db:
+            rows = db.execute(
+                "SELECT ticket_id, payload, result, attempts FROM tickets"
+                " WHERE queue = ? AND status IN (?, ?) AND next_attempt_at <= ?"
+                " ORDER BY next_attempt_at LIMIT ?",
+                (queue, QUEUED, PROCESSING, now, limit),
+            ).fetchall()
+            for ticket_id, *_ in rows:
+                db.execute(
+                    "UPDATE tickets SET status = ?, attempts = attempts + 1, updated_at = ?, next_attempt_at = ?"
+                    " WHERE ticket_id = ?",
+                    (PROCESSING, now, now + lease, ticket_id),
+                )
+        return [
+            {"ticketId": t, "payload": json.loads(p), "result": json.loads(r) if r else None, "attempts": a + 1}
+            for t, p, r, a in rows
+        ]
+
+    def update(self, queue, ticket_id, status, result, next_attempt_at=None):
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "UPDATE tickets SET status = ?, result = ?, updated_at = ?, next_attempt_at = ? WHERE ticket_id = ?",
+                (status, json.dumps(result), now, next_attempt_at or now, ticket_id),
+            )
+
+    def get(self, ticket_id):
+        with self._lock, self._connect() as db:
+            row = db.execute(
+                "SELECT status, result, attempts, created_at, updated_at FROM tickets WHERE ticket_id = ?",
+                (ticket_id,),
+            ).fetchone()
+        if not row:
+            return None
+        status, result, attempts, created_at, updated_at = row
+        return {
+            "ticketId": ticket_id, "status": status, "result": json.loads(result) if result else None,
+            "attempts": attempts, "createdAt": created_at, "updatedAt": updated_at,
+        }
+
+
+class DynamoWorkQueue:
+    """
+    DynamoDB-backed queue. Table: partition key ticket_id (S), GSI
+    'queue_status-next_attempt_at-index' on queue_status (S) + next_attempt_at (N),
+    TTL attribute expires_at.
+    """
+
+    INDEX = "queue_status-next_attempt_at-index"
+    RETENTION_SECONDS = 7 * 86400
+
+    def __init__(self, table_name):
+        self.table = ddb.Table(table_name)
+
+    def enqueue(self, queue, payload):
+        ticket_id, now = _new_ticket_id(), int(time.time())
+        self.table.put_item(Item={
+            "ticket_id": ticket_id, "queue_status": f"{queue}#{QUEUED}", "status": QUEUED,
+            "payload": json.dumps(payload), "attempts": 0, "created_at": now, "updated_at": now,
+            "next_attempt_at": now, "expires_at": now + self.RETENTION_SECONDS,
+        })
+        return ticket_id
+
+    def claim(self, queue, limit, lease):
+        now = int(time.time())
+        claimed = []
+        for status in (QUEUED, PROCESSING):  # PROCESSING: expired leases
+            if len(claimed) >= limit:
+                break
+            items = self.table.query(
+                IndexName=self.INDEX,
+                KeyConditionExpression=Key("queue_status").eq(f"{queue}#{status}") & Key("next_attempt_at").lte(now),
+                Limit=limit - len(claimed),
+            ).get("Items", [])
+            for item in items:
+                try:
+                    # Conditional claim so concurrent drains never take the same ticket
+                    self.table.update_item(
+                        Key={"ticket_id": item["ticket_id"]},
+                        UpdateExpression="SET queue_status = :p, #s = :ps, attempts = attempts + :one,"
+                                         " updated_at = :now, next_attempt_at = :lease",
+                        ConditionExpression="queue_status = :cur AND next_attempt_at <= :now",
+                        ExpressionAttributeNames={"#s": "status"},
+                        ExpressionAttributeValues={
+                            ":p": f"{queue}#{PROCESSING}", ":ps": PROCESSING, ":one": 1, ":now": now,
+                            ":lease": now + lease, ":cur": f"{queue}#{status}",
+                        },
+                    )
+                except ddb.meta.client.exceptions.ConditionalCheckFailedException:
+                    continue
+                claimed.append({
+                    "ticketId": item["ticket_id"], "payload": json.loads(item["payload"]),
+                    "result": json.loads(item["result"]) if item.get("result") else None,
+                    "attempts": int(item.get("attempts", 0)) + 1,
+                })
+        return claimed
+
+    def update(self, queue, ticket_id, status, result, next_attempt_at=None):
+        now = int(time.time())
+        self.table.update_item(
+            Key={"ticket_id": ticket_id},
+            UpdateExpression="SET queue_status = :qs, #s = :s, #r = :r, updated_at = :now, next_attempt_at = :next",
+            ExpressionAttributeNames={"#s": "status", "#r": "result"},
+            ExpressionAttributeValues={
+                ":qs": f"{queue}#{status}", ":s": status, ":r": json.dumps(result),
+                ":now": now, ":next": int(next_attempt_at or now),
+            },
+        )
+
+    def get(self, ticket_id):
+        item = self.table.get_item(Key={"ticket_id": ticket_id}).get("Item")
+        if not item:
+            return None
+        return {
+            "ticketId": ticket_id, "status": item.get("status"),
+            "result": json.loads(item["result"]) if item.get("result") else None,
+            "attempts": int(item.get("attempts", 0)),
+            "createdAt": int(item.get("created_at", 0)), "updatedAt": int(item.get("updated_at", 0)),
+        }
+
+
+def get_work_queue():
+    """
+    DynamoDB queue when DDB_TABLE_TECO_WORK_QUEUE is set; the SQLite stand-in
+    only for local runs that set WORK_QUEUE_SQLITE_PATH. A per-container file
+    in Lambda would strand tickets (the drain and status polls run in other
+    containers), so that raises WorkQueueUnavailable instead.
+    """
+    table_name = os.getenv("DDB_TABLE_TECO_WORK_QUEUE")
+    if table_name:
+        return DynamoWorkQueue(table_name)
+    sqlite_path = os.getenv("WORK_QUEUE_SQLITE_PATH")
+    if sqlite_path and not os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        return SqliteWorkQueue(sqlite_path)
+    raise WorkQueueUnavailable("Async processing requires DDB_TABLE_TECO_WORK_QUEUE to be configured.")